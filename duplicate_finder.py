@@ -0,0 +1,321 @@
+"""Duplicate detection pipeline used by the Duplicate Finder tab.
+
+Files are narrowed down in stages so that most of them are never read:
+  1. group by size (one stat per file, no reads)
+  2. hash a head+tail sample, only within same-size groups
+  3. hash the full content, only for files whose samples still collide
+"""
+import os
+import time
+import uuid
+from collections import Counter, defaultdict
+
+from file_walker import walk_files, DEFAULT_EXCLUDED_DIRS
+from hash_engine import HashEngine
+from hashing import hash_file, hash_file_sample, DEFAULT_ALGORITHM
+
+# Bytes read from each end of a file for the partial hash
+PARTIAL_HASH_SIZE = 64 * 1024
+# Minimum seconds between progress callbacks
+PROGRESS_INTERVAL = 0.25
+
+
+def collect_files(folder_path, recursive=True, cancel_event=None, exclude_dirs=DEFAULT_EXCLUDED_DIRS):
+    """Return {path: os.stat_result} for the non-hidden files under folder_path"""
+    return {record.path: record.stat
+            for record in walk_files(folder_path, recursive=recursive, exclude_dirs=exclude_dirs,
+                                     cancel_event=cancel_event)}
+
+
+class CachedHasher:
+    """Hashes files on a HashEngine, going through an optional HashCache"""
+
+    def __init__(self, file_stats, stats, engine, cache=None, verify=False,
+                 cancel_event=None, on_progress=None):
+        self.file_stats = file_stats
+        self.stats = stats
+        self.engine = engine
+        self.cache = cache
+        self.verify = verify
+        self.cancel_event = cancel_event
+        self.on_progress = on_progress
+        self.last_progress = 0
+
+    def cancelled(self):
+        return self.cancel_event is not None and self.cancel_event.is_set()
+
+    def _done(self, read_size):
+        self.stats['hashed_files'] += 1
+        self.stats['hashed_bytes'] += read_size
+        if self.on_progress:
+            now = time.monotonic()
+            if now - self.last_progress >= PROGRESS_INTERVAL:
+                self.last_progress = now
+                self.on_progress(self.stats)
+
+    def run(self, items):
+        """Hash (path, kind, func, args, read_size) items, yielding (path, hash).
+
+        Cache lookups stay on this thread; only misses go to the workers.
+        The hash is None for files that could not be read.
+        """
+        cached_hashes = {}
+        read_sizes = {}
+        jobs = []
+
+        for path, kind, hash_func, args, read_size in items:
+            if self.cancelled():
+                return
+            stat = self.file_stats[path]
+            cached = self.cache.get(stat, kind) if self.cache else None
+            if cached:
+                self.stats['cache_hits'] += 1
+                if not self.verify:
+                    self._done(read_size)
+                    yield path, cached
+                    continue
+                cached_hashes[path] = cached
+            read_sizes[path] = (kind, read_size)
+            jobs.append((path, stat.st_dev, hash_func, (path,) + args))
+
+        for path, file_hash in self.engine.run(jobs, self.cancel_event):
+            kind, read_size = read_sizes[path]
+            self.stats['bytes_read'] += read_size
+            self._done(read_size)
+
+            cached = cached_hashes.get(path)
+            if file_hash is not None and cached != file_hash and self.cache:
+                if cached:
+                    self.stats['cache_mismatches'] += 1
+                else:
+                    self.stats['cache_misses'] += 1
+                self.cache.put(self.file_stats[path], kind, file_hash)
+
+            yield path, file_hash
+
+
+def _split_groups(hasher, groups, make_item, on_split):
+    """Hash every member of groups ({key: [paths]}) and split them by hash.
+
+    on_split(key, subgroups) is called as soon as all members of a group
+    are hashed, with the {hash: [paths]} subgroups that have 2+ members.
+    """
+    group_of = {}
+    remaining = {}
+    hashes = {key: defaultdict(list) for key in groups}
+    items = []
+    for key, paths in groups.items():
+        remaining[key] = len(paths)
+        for path in paths:
+            group_of[path] = key
+            items.append(make_item(key, path))
+
+    for path, file_hash in hasher.run(items):
+        key = group_of[path]
+        if file_hash is not None:
+            hashes[key][file_hash].append(path)
+        remaining[key] -= 1
+        if remaining[key] == 0:
+            on_split(key, {h: sorted(paths) for h, paths in hashes[key].items() if len(paths) > 1})
+
+
+def link_groups(paths, file_stats):
+    """Split paths into lists of hardlinks to the same inode, in order"""
+    groups = {}
+    for path in paths:
+        stat = file_stats[path]
+        key = (stat.st_dev, stat.st_ino) if stat.st_ino else path
+        groups.setdefault(key, []).append(path)
+    return list(groups.values())
+
+
+def _unchanged(path, stat):
+    """True if path still has the size, mtime and inode recorded in stat"""
+    current = os.stat(path)
+    return (current.st_size == stat.st_size and current.st_mtime_ns == stat.st_mtime_ns
+            and current.st_ino == stat.st_ino)
+
+
+def replace_with_hardlinks(duplicates, file_stats, algorithm=None):
+    """Replace duplicate copies with hardlinks to one kept copy.
+
+    In each group the first path is kept (one per device, since links
+    can't cross filesystems) and every other copy is swapped atomically
+    for a link to it: the link is created under a temporary name in the
+    same directory and then os.replace()d over the copy. Copies changed
+    since the scan are skipped, and a group is skipped entirely if a kept
+    copy changed; with algorithm, kept copies are also re-hashed and must
+    still match the group's hash. Returns (replaced, errors, bytes_freed)
+    where replaced is a list of (path, kept_path).
+    """
+    replaced = []
+    errors = []
+    bytes_freed = 0
+
+    for file_hash, paths in duplicates.items():
+        keepers = {}
+        copies = []
+        for copy in link_groups(paths, file_stats):
+            keeper = keepers.setdefault(file_stats[copy[0]].st_dev, copy[0])
+            if keeper != copy[0]:
+                copies.append((keeper, copy))
+
+        # Linking to a kept copy that changed would spread its new data over every other copy
+        try:
+            for keeper in keepers.values():
+                if not _unchanged(keeper, file_stats[keeper]) or (
+                        algorithm is not None and hash_file(keeper, algorithm) != file_hash):
+                    raise OSError("kept copy changed since scan; group skipped")
+        except OSError as e:
+            errors.append((keeper, str(e)))
+            continue
+
+        for keeper, copy in copies:
+            stat = file_stats[copy[0]]
+            linked = 0
+            for path in copy:
+                try:
+                    if not _unchanged(path, stat):
+                        errors.append((path, "changed since scan"))
+                        continue
+
+                    temp_path = os.path.join(os.path.dirname(path), f".{os.path.basename(path)}.{uuid.uuid4().hex}.link")
+                    os.link(keeper, temp_path)
+                    try:
+                        os.replace(temp_path, path)
+                    except OSError:
+                        os.remove(temp_path)
+                        raise
+                    replaced.append((path, keeper))
+                    linked += 1
+                except OSError as e:
+                    errors.append((path, str(e)))
+
+            # Space comes back once the last link to the old inode is gone
+            if linked == len(copy) and stat.st_nlink <= len(copy):
+                bytes_freed += stat.st_size
+
+    return replaced, errors, bytes_freed
+
+
+def find_duplicates(file_stats, sample_size=PARTIAL_HASH_SIZE, cache=None, verify=False, engine=None,
+                    algorithm=DEFAULT_ALGORITHM, cancel_event=None, on_group=None, on_progress=None):
+    """Find files with identical content, hashed with the given algorithm.
+
+    file_stats is {path: os.stat_result} as returned by collect_files().
+    Hashing runs on engine (a HashEngine); a default one is used if omitted.
+    With a HashCache, digests of unchanged files are reused instead of
+    re-read; verify=True re-hashes cache hits and repairs mismatches.
+
+    Hardlinks to one inode are hashed once and never count as duplicates
+    of each other; a confirmed group lists every path of each of its
+    inodes, with links to the same inode next to each other.
+
+    on_group(full_hash, paths) is called for each confirmed group as soon
+    as it is found, and on_progress(stats) periodically while hashing.
+    Setting cancel_event stops the scan early with the groups found so far.
+    Returns (duplicates, stats) where duplicates is {full_hash: [paths]}
+    and stats holds per-stage counts and how many bytes were actually read.
+    Stats without inode numbers are replaced in file_stats by os.stat()
+    results for files that share their size with another.
+    """
+    # DirEntry.stat() leaves st_ino and st_dev at 0 on Windows; the files
+    # that can be duplicates need real ones for hardlinks and the cache
+    sizes = Counter(stat.st_size for stat in file_stats.values())
+    for path, stat in list(file_stats.items()):
+        if not stat.st_ino and sizes[stat.st_size] > 1:
+            try:
+                file_stats[path] = os.stat(path)
+            except OSError:
+                pass
+
+    # Key files by inode so each one is read once, through one representative path
+    inodes = defaultdict(list)
+    for path, stat in file_stats.items():
+        # Some filesystems report no inode numbers; treat those files as distinct
+        key = (stat.st_dev, stat.st_ino) if stat.st_ino else path
+        inodes[key].append(path)
+    links = {}
+    for paths in inodes.values():
+        paths.sort()
+        links[paths[0]] = paths
+
+    stats = {
+        'files': len(links),
+        'paths': len(file_stats),
+        'hardlinked_paths': len(file_stats) - len(links),
+        'total_bytes': sum(file_stats[path].st_size for path in links),
+        'size_candidates': 0,
+        'partial_hashed': 0,
+        'full_hashed': 0,
+        'bytes_read': 0,
+        'cache_hits': 0,
+        'cache_misses': 0,
+        'cache_mismatches': 0,
+        'hashed_files': 0,
+        'hashed_bytes': 0,
+        'expected_files': 0,
+        'expected_bytes': 0,
+        'started': time.monotonic(),
+    }
+    own_engine = engine is None
+    if own_engine:
+        engine = HashEngine()
+    hasher = CachedHasher(file_stats, stats, engine, cache, verify, cancel_event, on_progress)
+    full_kind = algorithm
+    partial_kind = f"{algorithm}-sample{sample_size}"
+    duplicates = {}
+
+    def confirm(subgroups):
+        for file_hash, representatives in subgroups.items():
+            paths = [path for rep in representatives for path in links[rep]]
+            duplicates[file_hash] = paths
+            if on_group:
+                on_group(file_hash, paths)
+
+    # Stage 1: only files sharing a size can be duplicates
+    by_size = defaultdict(list)
+    for path in links:
+        by_size[file_stats[path].st_size].append(path)
+    size_groups = {size: paths for size, paths in by_size.items() if len(paths) > 1}
+    stats['size_candidates'] = sum(len(paths) for paths in size_groups.values())
+    stats['partial_hashed'] = stats['size_candidates']
+    stats['expected_files'] = stats['size_candidates']
+    stats['expected_bytes'] = sum(len(paths) * min(size, 2 * sample_size) for size, paths in size_groups.items())
+
+    # Stage 2: cheap head+tail sample within each size group. Files no
+    # larger than two samples are hashed whole here and are then final.
+    def sample_item(size, path):
+        if size <= 2 * sample_size:
+            return path, full_kind, hash_file, (algorithm,), size
+        return path, partial_kind, hash_file_sample, (size, sample_size, algorithm), 2 * sample_size
+
+    collisions = {}
+
+    def on_sampled(size, subgroups):
+        if size <= 2 * sample_size:
+            confirm(subgroups)
+            return
+        for partial_hash, paths in subgroups.items():
+            collisions[(size, partial_hash)] = paths
+            stats['full_hashed'] += len(paths)
+            stats['expected_files'] += len(paths)
+            stats['expected_bytes'] += len(paths) * size
+
+    try:
+        _split_groups(hasher, size_groups, sample_item, on_sampled)
+
+        # Stage 3: full hash only for files whose samples still collide
+        _split_groups(hasher, collisions,
+                      lambda key, path: (path, full_kind, hash_file, (algorithm,), key[0]),
+                      lambda key, subgroups: confirm(subgroups))
+    finally:
+        if cache:
+            cache.flush()
+        if own_engine:
+            engine.close()
+
+    stats['cancelled'] = hasher.cancelled()
+    if on_progress:
+        on_progress(stats)
+    return duplicates, stats
@@ -0,0 +1,122 @@
+"""In-memory index of a folder listing for instant filtering and search.
+
+Built once when a folder is loaded, from the names in row order:
+
+    by_ext      extension -> ascending row ids
+    keys        lowercased names sorted, with key_rows their row ids,
+                for prefix lookups with bisect
+    haystack    all lowercased names joined by newlines, with the offset
+                where each row starts, so a rare substring is found with
+                a few str.find() calls instead of a pass over every name
+
+view() combines an extension and a search into the row ids to show,
+in row order; None means every row.
+"""
+import bisect
+import fnmatch
+import itertools
+import os
+import re
+
+GLOB_CHARS = re.compile(r'[*?[]')
+# A glob split into its wildcards and bracket expressions, leaving literal runs
+GLOB_TOKENS = re.compile(r'\*|\?|\[[^\]]*\]?')
+# Above this share of rows containing the text, scanning every name beats find()
+FIND_MAX_SHARE = 64
+
+
+def extension(name):
+    return os.path.splitext(name)[1].lower()
+
+
+class FileIndex:
+    def __init__(self, names):
+        self.names = [name.lower() for name in names]
+        self.by_ext = {}
+        for row, name in enumerate(names):
+            self.by_ext.setdefault(extension(name), []).append(row)
+
+        self.key_rows = sorted(range(len(self.names)), key=self.names.__getitem__)
+        self.keys = [self.names[row] for row in self.key_rows]
+
+        self.haystack = "\n".join(self.names) + "\n"
+        self.starts = list(itertools.accumulate((len(name) + 1 for name in self.names), initial=0))
+
+    def extensions(self):
+        """Extensions present, most common first"""
+        return sorted(self.by_ext, key=lambda ext: (-len(self.by_ext[ext]), ext))
+
+    def prefix(self, text):
+        """Ascending row ids of names starting with text (case-insensitive)"""
+        text = text.lower()
+        lo = bisect.bisect_left(self.keys, text)
+        hi = bisect.bisect_left(self.keys, text + "\U0010ffff", lo)
+        return sorted(self.key_rows[lo:hi])
+
+    def containing(self, text):
+        """Ascending row ids of names containing text (case-insensitive)"""
+        text = text.lower()
+        if not text:
+            return list(range(len(self.names)))
+        if "\n" in text:
+            return []
+        if self.haystack.count(text) * FIND_MAX_SHARE > len(self.names):
+            return [row for row, name in enumerate(self.names) if text in name]
+
+        rows = []
+        find, starts, row_at = self.haystack.find, self.starts, bisect.bisect_right
+        pos = find(text)
+        while pos != -1:
+            row = row_at(starts, pos) - 1
+            rows.append(row)
+            pos = find(text, starts[row + 1])  # one hit per name is enough
+        return rows
+
+    def glob(self, pattern):
+        """Ascending row ids of names matching a shell-style pattern (case-insensitive)"""
+        pattern = pattern.lower()
+
+        # Common shapes need no regex: "*", "*text*", "*.ext", "text*"
+        inner = pattern.strip("*")
+        if not inner:
+            return list(range(len(self.names)))
+        if not GLOB_CHARS.search(inner):
+            if pattern.startswith("*") and pattern.endswith("*"):
+                return self.containing(inner)
+            if pattern.startswith("*"):
+                return [row for row, name in enumerate(self.names) if name.endswith(inner)]
+            if pattern.endswith("*"):
+                return self.prefix(inner)
+
+        regex = re.compile(fnmatch.translate(pattern))
+        literals = [part for part in GLOB_TOKENS.split(pattern) if part]
+
+        # Narrow the candidates with the index before running the regex
+        if literals and pattern.startswith(literals[0]):
+            candidates = self.prefix(literals[0])
+        elif literals:
+            candidates = self.containing(max(literals, key=len))
+        else:
+            candidates = range(len(self.names))
+        names = self.names
+        return [row for row in candidates if regex.match(names[row])]
+
+    def search(self, text):
+        """Glob match if text has wildcards, otherwise substring match"""
+        if GLOB_CHARS.search(text):
+            return self.glob(text)
+        return self.containing(text)
+
+    def view(self, ext=None, text=""):
+        """Row ids with extension ext (any if None) whose name matches text, or None for all rows"""
+        rows = None
+        if ext is not None:
+            rows = self.by_ext.get(ext, [])
+        if text:
+            found = self.search(text)
+            if rows is None:
+                rows = found
+            else:
+                keep = set(found)
+                rows = [row for row in rows if row in keep]
+        return rows
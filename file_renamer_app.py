@@ -3,8 +3,19 @@ from tkinter import ttk, filedialog, messagebox
 from tkinterdnd2 import DND_FILES, TkinterDnD
 import os
 import json
-from datetime import datetime
 from pathlib import Path
+from file_index import FileIndex
+from file_times import CreationTimes
+from rename_engine import RenameEngine
+from rename_journal import RenameJournal
+from tree_rename import (FolderTree, plan_tree, flatten_plans, check_tree_conflicts, execute_tree,
+                         undo_batches, resume_batches, group_incomplete)
+from virtual_list import VirtualList
+
+# Quiet time after the last keystroke before the preview is refreshed
+LIVE_PREVIEW_DELAY_MS = 250
+ALL_FILES = "All Files"
+NO_EXTENSION = "(no extension)"
 
 # TODO: Add custom app icon here
 # To set a custom icon, uncomment the line below in __init__ and replace 'icon.icns' with your icon file path
@@ -19,8 +30,14 @@ class FileRenamerApp:
         # Store selected folder and files
         self.folder_path = ""
         self.files = []
-        self.selected_files = set()
-        self.last_rename_history = []  # For undo functionality
+        self.tree = None  # FolderTree of the folder (and subfolders) taken when it was loaded
+        self.file_index = FileIndex([])  # extension and name index of self.files
+        self.creation_times = CreationTimes()
+        self.live_preview_job = None
+        try:
+            self.rename_journal = RenameJournal()  # crash recovery and undo that survives restarts
+        except OSError:
+            self.rename_journal = RenameJournal(None)
 
         # Recent folders tracking
         self.recent_folders_file = os.path.join(os.path.expanduser("~"), ".file_renamer_recent.json")
@@ -32,6 +49,9 @@ class FileRenamerApp:
         # Enable drag and drop for folder
         self.setup_drag_drop()
 
+        # Finish or revert renames interrupted by a crash once the window is up
+        self.root.after_idle(self.recover_renames)
+
     def create_widgets(self):
         # Action buttons - PACK FIRST so they stick to bottom
         button_frame = ttk.Frame(self.root, padding="10")
@@ -41,6 +61,7 @@ class FileRenamerApp:
         ttk.Button(button_frame, text="Apply Rename", command=self.apply_rename).pack(side=tk.LEFT, padx=5)
         self.undo_button = ttk.Button(button_frame, text="Undo Last Rename", command=self.undo_rename, state="disabled")
         self.undo_button.pack(side=tk.LEFT, padx=5)
+        self.update_undo_button()
         ttk.Button(button_frame, text="Clear", command=self.clear_all).pack(side=tk.RIGHT, padx=5)
 
         # Folder selection section
@@ -71,24 +92,19 @@ class FileRenamerApp:
         select_button_frame.pack(fill=tk.X, pady=(0, 5))
         ttk.Button(select_button_frame, text="Select All", command=self.select_all).pack(side=tk.LEFT, padx=2)
         ttk.Button(select_button_frame, text="Deselect All", command=self.deselect_all).pack(side=tk.LEFT, padx=2)
-
-        # Scrollable file list with checkboxes
-        self.file_tree = ttk.Treeview(files_frame, columns=("Selected", "Type", "Name"), show="headings", height=8)
-        self.file_tree.heading("Selected", text="✓")
-        self.file_tree.heading("Type", text="Extension")
-        self.file_tree.heading("Name", text="Current Name")
-        self.file_tree.column("Selected", width=30, anchor="center")
-        self.file_tree.column("Type", width=80)
-        self.file_tree.column("Name", width=400)
-
-        # Bind click event to toggle selection
-        self.file_tree.bind("<Button-1>", self.toggle_file_selection)
-
-        scrollbar = ttk.Scrollbar(files_frame, orient=tk.VERTICAL, command=self.file_tree.yview)
-        self.file_tree.configure(yscroll=scrollbar.set)
-
-        self.file_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        # Substring search, or glob when it has wildcards (e.g. IMG_*_2023*.jpg)
+        self.search_var = tk.StringVar()
+        ttk.Entry(select_button_frame, textvariable=self.search_var, width=25).pack(side=tk.RIGHT, padx=2)
+        ttk.Label(select_button_frame, text="Search:").pack(side=tk.RIGHT)
+        self.search_var.trace_add("write", lambda *args: self.apply_filter())
+
+        # Scrollable file list with checkboxes; only the visible rows are drawn,
+        # and clicking a row toggles its check mark
+        self.file_list = VirtualList(files_frame,
+                                     [("Selected", "✓", 30), ("Type", "Extension", 80), ("Name", "Current Name", 400)],
+                                     lambda file_info: (file_info['ext'], file_info['rel']), height=8)
+        self.file_list.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.file_list.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
 
         # Rename options section
         options_frame = ttk.LabelFrame(self.root, text="Rename Options", padding="10")
@@ -108,6 +124,9 @@ class FileRenamerApp:
         ttk.Radiobutton(mode_frame, text="Find & Replace",
                        variable=self.rename_mode_var, value="find_replace",
                        command=self.update_mode_ui).pack(side=tk.LEFT)
+        ttk.Radiobutton(mode_frame, text="Template",
+                       variable=self.rename_mode_var, value="template",
+                       command=self.update_mode_ui).pack(side=tk.LEFT, padx=10)
 
         # Sort order selection
         sort_frame = ttk.Frame(options_frame)
@@ -135,9 +154,27 @@ class FileRenamerApp:
         ttk.Label(self.find_replace_frame, text="Replace with:").pack(side=tk.LEFT, padx=(10, 0))
         self.replace_var = tk.StringVar()
         ttk.Entry(self.find_replace_frame, textvariable=self.replace_var, width=20).pack(side=tk.LEFT, padx=5)
+        self.find_regex_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(self.find_replace_frame, text="Regex", variable=self.find_regex_var).pack(side=tk.LEFT, padx=(10, 0))
+        self.ignore_case_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(self.find_replace_frame, text="Ignore case", variable=self.ignore_case_var).pack(side=tk.LEFT, padx=5)
+        self.whole_name_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(self.find_replace_frame, text="Match whole name", variable=self.whole_name_var).pack(side=tk.LEFT)
         # Hide by default
         self.find_replace_frame.pack_forget()
 
+        # Template inputs (only for template mode), e.g. {date:%Y%m%d}_{camera}_{n:05}{ext}
+        self.template_frame = ttk.Frame(options_frame)
+        self.template_frame.pack(fill=tk.X, pady=5)
+        ttk.Label(self.template_frame, text="Template:").pack(side=tk.LEFT)
+        self.template_var = tk.StringVar(value="{date:%Y%m%d}_{n:03}{ext}")
+        ttk.Entry(self.template_frame, textvariable=self.template_var, width=35).pack(side=tk.LEFT, padx=5)
+        ttk.Label(self.template_frame, text="Match regex:").pack(side=tk.LEFT, padx=(10, 0))
+        self.template_regex_var = tk.StringVar()
+        ttk.Entry(self.template_frame, textvariable=self.template_regex_var, width=20).pack(side=tk.LEFT, padx=5)
+        # Hide by default
+        self.template_frame.pack_forget()
+
         # Date options
         self.date_frame = ttk.Frame(options_frame)
         self.date_frame.pack(fill=tk.X, pady=5)
@@ -154,33 +191,45 @@ class FileRenamerApp:
         ttk.Radiobutton(self.date_frame, text="At end", variable=self.date_position_var, value="end").pack(side=tk.LEFT, padx=10)
         ttk.Radiobutton(self.date_frame, text="At beginning", variable=self.date_position_var, value="start").pack(side=tk.LEFT)
 
+        # Recursive renaming: each subfolder is planned and renamed on its own
+        scope_frame = ttk.Frame(options_frame)
+        scope_frame.pack(fill=tk.X, pady=5)
+        self.recursive_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(scope_frame, text="Include subfolders", variable=self.recursive_var,
+                        command=self.reload_files).pack(side=tk.LEFT)
+        self.global_counter_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(scope_frame, text="One counter across folders",
+                        variable=self.global_counter_var).pack(side=tk.LEFT, padx=10)
+
         # File type filter (dropdown)
         filter_frame = ttk.Frame(options_frame)
         filter_frame.pack(fill=tk.X, pady=5)
         ttk.Label(filter_frame, text="Show only:").pack(side=tk.LEFT)
-        self.filter_var = tk.StringVar(value="All Files")
-        filter_dropdown = ttk.Combobox(filter_frame, textvariable=self.filter_var,
-                                       values=["All Files", ".jpg", ".jpeg", ".png", ".gif", ".pdf",
-                                              ".txt", ".doc", ".docx", ".mp4", ".mp3", ".heic", ".wav"],
-                                       state="readonly", width=15)
-        filter_dropdown.pack(side=tk.LEFT, padx=10)
-        filter_dropdown.bind("<<ComboboxSelected>>", lambda e: self.apply_filter())
+        self.filter_var = tk.StringVar(value=ALL_FILES)
+        # Filled with the extensions found when a folder is loaded
+        self.filter_dropdown = ttk.Combobox(filter_frame, textvariable=self.filter_var,
+                                            values=[ALL_FILES], state="readonly", width=15)
+        self.filter_dropdown.pack(side=tk.LEFT, padx=10)
+        self.filter_dropdown.bind("<<ComboboxSelected>>", lambda e: self.apply_filter())
 
         # Preview section
         preview_frame = ttk.LabelFrame(self.root, text="Preview", padding="10")
         preview_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
 
-        self.preview_tree = ttk.Treeview(preview_frame, columns=("Old", "New"), show="headings", height=6)
-        self.preview_tree.heading("Old", text="Current Name")
-        self.preview_tree.heading("New", text="New Name")
-        self.preview_tree.column("Old", width=300)
-        self.preview_tree.column("New", width=300)
+        self.preview_status_label = ttk.Label(preview_frame, text="", foreground="gray")
+        self.preview_status_label.pack(side=tk.BOTTOM, fill=tk.X)
 
-        preview_scrollbar = ttk.Scrollbar(preview_frame, orient=tk.VERTICAL, command=self.preview_tree.yview)
-        self.preview_tree.configure(yscroll=preview_scrollbar.set)
+        # Rows are (old_name, new_name); only the visible ones are drawn
+        self.preview_list = VirtualList(preview_frame, [("Old", "Current Name", 300), ("New", "New Name", 300)],
+                                        lambda pair: pair, height=6, checkable=False)
+        self.preview_list.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.preview_list.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
 
-        self.preview_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-        preview_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        # Refresh the preview while the user types
+        for var in (self.rename_mode_var, self.sort_var, self.date_format_var, self.date_position_var,
+                    self.pattern_var, self.find_var, self.replace_var, self.find_regex_var, self.ignore_case_var,
+                    self.whole_name_var, self.template_var, self.template_regex_var, self.global_counter_var):
+            var.trace_add("write", self.schedule_live_preview)
 
     def setup_drag_drop(self):
         """Enable drag and drop for folder selection"""
@@ -211,73 +260,67 @@ class FileRenamerApp:
             self.load_files()
 
     def load_files(self):
-        """Load files from selected folder"""
+        """Load files from selected folder (and its subfolders if recursive)"""
         self.files = []
-        self.selected_files = set()
-        self.file_tree.delete(*self.file_tree.get_children())
+        self.tree = None
 
+        # One scan per folder; sorting, preview and apply reuse these stat results
         try:
-            for filename in os.listdir(self.folder_path):
-                file_path = os.path.join(self.folder_path, filename)
+            self.tree = FolderTree.capture(self.folder_path, recursive=self.recursive_var.get())
+            for folder, snapshot in self.tree.snapshots.items():
+                ctimes = self.creation_times.for_records(folder, snapshot.records)
+                for record in snapshot.records:
+                    filename = record.name
 
-                # Skip hidden files and directories
-                if filename.startswith('.') or os.path.isdir(file_path):
-                    continue
+                    # Get file extension and creation time
+                    ext = Path(filename).suffix.lower()
+                    ctime = ctimes[filename]
 
-                # Get file extension and creation time
-                ext = Path(filename).suffix.lower()
-                ctime = os.path.getctime(file_path)
-
-                self.files.append({'name': filename, 'ext': ext, 'ctime': ctime})
-                self.file_tree.insert("", tk.END, values=("", ext, filename))
+                    self.files.append({'name': filename, 'ext': ext, 'ctime': ctime,
+                                       'path': record.path, 'size': record.stat.st_size,
+                                       'folder': folder, 'rel': self.tree.relative(folder, filename)})
 
         except Exception as e:
             messagebox.showerror("Error", f"Could not load files: {str(e)}")
 
-    def toggle_file_selection(self, event):
-        """Toggle file selection when clicked"""
-        region = self.file_tree.identify("region", event.x, event.y)
-        if region == "cell" or region == "tree":
-            item = self.file_tree.identify_row(event.y)
-            if item:
-                values = self.file_tree.item(item, "values")
-                filename = values[2]  # Name is in column 2
-
-                if filename in self.selected_files:
-                    self.selected_files.remove(filename)
-                    self.file_tree.item(item, values=("", values[1], values[2]))
-                else:
-                    self.selected_files.add(filename)
-                    self.file_tree.item(item, values=("✓", values[1], values[2]))
+        self.file_list.set_rows(self.files)
+        self.file_index = FileIndex([file_info['rel'] for file_info in self.files])
+        self.update_filter_choices()
+        self.apply_filter()
+
+    def reload_files(self):
+        """Reload the folder, e.g. after switching subfolders on or off"""
+        if self.folder_path:
+            self.load_files()
+            self.clear_preview()
+
+    def selected_paths(self):
+        """Paths of the checked files, including ones hidden by the filter"""
+        return {file_info['path'] for file_info in self.file_list.selected_rows()}
 
     def select_all(self):
         """Select all visible files"""
-        for item in self.file_tree.get_children():
-            values = self.file_tree.item(item, "values")
-            filename = values[2]
-            self.selected_files.add(filename)
-            self.file_tree.item(item, values=("✓", values[1], values[2]))
+        self.file_list.select_all()
 
     def deselect_all(self):
         """Deselect all files"""
-        self.selected_files.clear()
-        for item in self.file_tree.get_children():
-            values = self.file_tree.item(item, "values")
-            self.file_tree.item(item, values=("", values[1], values[2]))
+        self.file_list.deselect_all()
+
+    def update_filter_choices(self):
+        """Offer the extensions present in the folder, most common first"""
+        choices = [ALL_FILES] + [ext or NO_EXTENSION for ext in self.file_index.extensions()]
+        self.filter_dropdown.config(values=choices)
+        if self.filter_var.get() not in choices:
+            self.filter_var.set(ALL_FILES)
 
     def apply_filter(self):
-        """Filter displayed files by extension"""
+        """Show the files matching the extension filter and the search text"""
         filter_ext = self.filter_var.get()
-        self.file_tree.delete(*self.file_tree.get_children())
-
-        for file_info in self.files:
-            filename = file_info['name']
-            ext = file_info['ext']
-
-            # Apply filter
-            if filter_ext == "All Files" or ext == filter_ext:
-                is_selected = "✓" if filename in self.selected_files else ""
-                self.file_tree.insert("", tk.END, values=(is_selected, ext, filename))
+        if filter_ext == ALL_FILES:
+            filter_ext = None
+        elif filter_ext == NO_EXTENSION:
+            filter_ext = ""
+        self.file_list.set_visible(self.file_index.view(filter_ext, self.search_var.get().strip()))
 
     def update_mode_ui(self):
         """Update UI based on rename mode"""
@@ -287,221 +330,229 @@ class FileRenamerApp:
             # Show pattern frame, hide find/replace
             self.pattern_frame.pack(fill=tk.X, pady=5)
             self.find_replace_frame.pack_forget()
+            self.template_frame.pack_forget()
             for widget in self.pattern_frame.winfo_children():
                 widget.configure(state="normal")
         elif mode == "find_replace":
             # Show find/replace frame, hide pattern
             self.find_replace_frame.pack(fill=tk.X, pady=5)
             self.pattern_frame.pack_forget()
+            self.template_frame.pack_forget()
+        elif mode == "template":
+            self.template_frame.pack(fill=tk.X, pady=5)
+            self.pattern_frame.pack_forget()
+            self.find_replace_frame.pack_forget()
         else:
-            # date_only mode - hide both pattern and find/replace
+            # date_only mode - hide pattern, find/replace and template
             self.pattern_frame.pack_forget()
             self.find_replace_frame.pack_forget()
+            self.template_frame.pack_forget()
+
+    def make_rename_engine(self):
+        """Build a RenameEngine from the current options"""
+        return RenameEngine(
+            mode=self.rename_mode_var.get(),
+            pattern=self.pattern_var.get(),
+            find_text=self.find_var.get(),
+            replace_text=self.replace_var.get(),
+            date_format=self.date_format_var.get(),
+            date_position=self.date_position_var.get(),
+            sort_order=self.sort_var.get(),
+            template=self.template_var.get(),
+            template_regex=self.template_regex_var.get(),
+            find_regex=self.find_regex_var.get(),
+            ignore_case=self.ignore_case_var.get(),
+            whole_name=self.whole_name_var.get()
+        )
+
+    def make_rename_plans(self):
+        """Plan the selected files folder by folder: {folder_path: [(old_name, new_name)]}"""
+        engine = self.make_rename_engine()
+        selected = self.selected_paths()
+        if engine.uses_creation_time():
+            # Creation-time fallbacks (EXIF) are read only for the files being renamed
+            self.creation_times.fill(f for f in self.files if f['path'] in selected)
+        return plan_tree(engine, self.files, selected, global_counter=self.global_counter_var.get())
+
+    def show_preview(self, plans):
+        """Show the plans in the preview list and return (has_conflict, message)"""
+        rename_map = flatten_plans(self.tree, plans)
+        self.preview_list.update_rows(rename_map)
 
-    def get_filtered_files(self):
-        """Get only selected files and sort them"""
-        selected = [f for f in self.files if f['name'] in self.selected_files]
-
-        # Sort based on selected order
-        sort_order = self.sort_var.get()
-        if sort_order == "name":
-            selected.sort(key=lambda x: x['name'].lower())
-        elif sort_order == "date_asc":
-            selected.sort(key=lambda x: x['ctime'])
-        elif sort_order == "date_desc":
-            selected.sort(key=lambda x: x['ctime'], reverse=True)
-
-        return selected
-
-    def format_date(self, timestamp):
-        """Format date based on selected format"""
-        date_obj = datetime.fromtimestamp(timestamp)
-        format_type = self.date_format_var.get()
-
-        if format_type == "YYYYMMDD":
-            return date_obj.strftime("%Y%m%d")
-        elif format_type == "YYYY-MM-DD":
-            return date_obj.strftime("%Y-%m-%d")
-        elif format_type == "DDMMYYYY":
-            return date_obj.strftime("%d%m%Y")
-        elif format_type == "DD-MM-YYYY":
-            return date_obj.strftime("%d-%m-%Y")
-        elif format_type == "MMDDYYYY":
-            return date_obj.strftime("%m%d%Y")
-
-        return date_obj.strftime("%Y%m%d")  # Default
-
-    def generate_new_name(self, filename, index):
-        """Generate new filename based on options"""
-        mode = self.rename_mode_var.get()
-        file_path = os.path.join(self.folder_path, filename)
-        ext = Path(filename).suffix
-        base_name_without_ext = Path(filename).stem
-
-        # Get file creation date
-        timestamp = os.path.getctime(file_path)
-        date_str = self.format_date(timestamp)
-        date_position = self.date_position_var.get()
-
-        if mode == "date_only":
-            # Keep original name and just add date
-            if date_position == "start":
-                new_name = f"{date_str}_{base_name_without_ext}{ext}"
-            else:
-                new_name = f"{base_name_without_ext}_{date_str}{ext}"
-        elif mode == "find_replace":
-            # Find and replace mode
-            find_text = self.find_var.get()
-            replace_text = self.replace_var.get()
-            new_base_name = base_name_without_ext.replace(find_text, replace_text)
-            new_name = f"{new_base_name}{ext}"
+        # Check for conflicts
+        has_conflict, conflict_msg = check_tree_conflicts(self.tree, plans)
+        if has_conflict:
+            self.preview_status_label.config(text=conflict_msg, foreground="red")
         else:
-            # Pattern rename mode
-            pattern = self.pattern_var.get()
-            base_name = f"{pattern}_{str(index+1).zfill(3)}"
+            status = f"{len(rename_map)} file(s) will be renamed"
+            if len(plans) > 1:
+                status += f" in {len(plans)} folders"
+            self.preview_status_label.config(text=status, foreground="gray")
+        return has_conflict, conflict_msg
 
-            # Add date if in pattern mode
-            if date_position == "start":
-                new_name = f"{date_str}_{base_name}{ext}"
-            else:
-                new_name = f"{base_name}_{date_str}{ext}"
-
-        return new_name
-
-    def check_conflicts(self, rename_map):
-        """Check for naming conflicts"""
-        new_names = [new_name for old_name, new_name in rename_map]
-
-        # Check for duplicates in new names
-        if len(new_names) != len(set(new_names)):
-            duplicates = [name for name in new_names if new_names.count(name) > 1]
-            return True, f"Conflict detected! These names would be duplicated: {', '.join(set(duplicates))}"
-
-        # Check if any new name conflicts with existing files (that aren't being renamed)
-        existing_files = set([f['name'] for f in self.files])
-        files_being_renamed = set([old_name for old_name, new_name in rename_map])
-
-        for old_name, new_name in rename_map:
-            if new_name in existing_files and new_name not in files_being_renamed:
-                return True, f"Conflict detected! '{new_name}' already exists in the folder."
-
-        return False, ""
+    def clear_preview(self):
+        self.preview_list.clear()
+        self.preview_status_label.config(text="")
 
     def preview_changes(self):
         """Show preview of what files will be renamed to"""
-        self.preview_tree.delete(*self.preview_tree.get_children())
-
         if not self.folder_path:
+            self.clear_preview()
             messagebox.showwarning("Warning", "Please select a folder first")
             return
 
-        filtered_files = self.get_filtered_files()
+        try:
+            plans = self.make_rename_plans()
+        except ValueError as e:
+            self.clear_preview()
+            messagebox.showerror("Invalid Rename Options", str(e))
+            return
 
-        if not filtered_files:
+        if not plans:
+            self.clear_preview()
             messagebox.showinfo("Info", "No files selected. Please select files by clicking on them.")
             return
 
-        rename_map = []
-        for index, file_info in enumerate(filtered_files):
-            old_name = file_info['name']
-            new_name = self.generate_new_name(old_name, index)
-            rename_map.append((old_name, new_name))
-            self.preview_tree.insert("", tk.END, values=(old_name, new_name))
-
-        # Check for conflicts
-        has_conflict, conflict_msg = self.check_conflicts(rename_map)
+        has_conflict, conflict_msg = self.show_preview(plans)
         if has_conflict:
             messagebox.showwarning("Naming Conflict", conflict_msg)
 
+    def schedule_live_preview(self, *args):
+        """Debounce typing: preview once the options have been still for a moment"""
+        if self.live_preview_job is not None:
+            self.root.after_cancel(self.live_preview_job)
+        self.live_preview_job = self.root.after(LIVE_PREVIEW_DELAY_MS, self.live_preview)
+
+    def live_preview(self):
+        """Quietly re-plan the selected files; unchanged preview lines are not redrawn"""
+        self.live_preview_job = None
+        if not self.file_list.has_selection():
+            return
+        try:
+            plans = self.make_rename_plans()
+        except ValueError as e:
+            # The rows of the last valid plan no longer match the options
+            self.clear_preview()
+            self.preview_status_label.config(text=str(e), foreground="red")
+            return
+        self.show_preview(plans)
+
     def apply_rename(self):
         """Actually rename the files"""
         if not self.folder_path:
             messagebox.showwarning("Warning", "Please select a folder first")
             return
 
-        filtered_files = self.get_filtered_files()
+        # Folders are only listed at load; one stat per folder tells whether
+        # that listing still matches what is on disk
+        if not self.tree or not self.tree.is_current():
+            selected = self.selected_paths()
+            self.load_files()
+            self.file_list.select_rows(lambda file_info: file_info['path'] in selected)
+            messagebox.showwarning("Folder Changed",
+                                   "Files in the folder changed since it was loaded. "
+                                   "The list has been refreshed; please preview again.")
+            return
 
-        if not filtered_files:
-            messagebox.showinfo("Info", "No files to rename")
+        # Build rename plans, one per folder
+        try:
+            plans = self.make_rename_plans()
+        except ValueError as e:
+            messagebox.showerror("Invalid Rename Options", str(e))
             return
 
-        # Build rename map
-        rename_map = []
-        for index, file_info in enumerate(filtered_files):
-            old_name = file_info['name']
-            new_name = self.generate_new_name(old_name, index)
-            rename_map.append((old_name, new_name))
+        if not plans:
+            messagebox.showinfo("Info", "No files to rename")
+            return
 
         # Check for conflicts
-        has_conflict, conflict_msg = self.check_conflicts(rename_map)
+        has_conflict, conflict_msg = check_tree_conflicts(self.tree, plans)
         if has_conflict:
             messagebox.showerror("Cannot Rename", conflict_msg)
             return
 
         # Confirm with user
+        file_count = sum(len(plan) for plan in plans.values())
+        where = f" in {len(plans)} folders" if len(plans) > 1 else ""
         result = messagebox.askyesno("Confirm",
-            f"This will rename {len(filtered_files)} file(s). Continue?")
+            f"This will rename {file_count} file(s){where}. Continue?")
 
         if not result:
             return
 
-        try:
-            # Store history for undo
-            self.last_rename_history = []
-
-            renamed_count = 0
-            for old_name, new_name in rename_map:
-                old_path = os.path.join(self.folder_path, old_name)
-                new_path = os.path.join(self.folder_path, new_name)
-
-                # Rename the file
-                os.rename(old_path, new_path)
-                self.last_rename_history.append((new_name, old_name))  # Store reverse for undo
-                renamed_count += 1
-
-            messagebox.showinfo("Success", f"Successfully renamed {renamed_count} file(s)!")
+        # Each folder's swaps and chains are ordered safely and journaled for
+        # undo; folders run in parallel and a failing one is rolled back alone
+        renamed, failed = execute_tree(self.tree, plans, journal=self.rename_journal)
 
-            # Enable undo button
-            self.undo_button.config(state="normal")
+        if failed:
+            folder_path, error = next(iter(failed.items()))
+            messagebox.showerror("Error",
+                f"Renamed files in {len(renamed)} folder(s), but {len(failed)} folder(s) were left unchanged.\n\n"
+                f"{folder_path}: {error}")
+        else:
+            messagebox.showinfo("Success", f"Successfully renamed {file_count} file(s)!")
 
-            # Reload files to show new names
-            self.load_files()
-            self.preview_tree.delete(*self.preview_tree.get_children())
+        # Enable undo button
+        self.update_undo_button()
 
-        except Exception as e:
-            messagebox.showerror("Error", f"Error renaming files: {str(e)}")
+        # Reload files to show new names
+        self.load_files()
+        self.clear_preview()
 
     def undo_rename(self):
         """Undo the last rename operation"""
-        if not self.last_rename_history:
+        batches = self.rename_journal.last_undoable()
+        if not batches:
             messagebox.showinfo("Info", "Nothing to undo")
             return
 
+        file_count = sum(len(batch['plan']) for batch in batches)
+        where = batches[0]['folder'] if len(batches) == 1 else f"{len(batches)} folders"
         result = messagebox.askyesno("Confirm Undo",
-            f"This will undo the last rename operation ({len(self.last_rename_history)} files). Continue?")
+            f"This will undo the last rename operation ({file_count} files in {where}). Continue?")
 
         if not result:
             return
 
-        try:
-            for current_name, original_name in self.last_rename_history:
-                current_path = os.path.join(self.folder_path, current_name)
-                original_path = os.path.join(self.folder_path, original_name)
-
-                if os.path.exists(current_path):
-                    os.rename(current_path, original_path)
-
+        # Files removed since the rename are skipped
+        undone, failed = undo_batches(self.rename_journal, batches)
+        if failed:
+            folder_path, error = next(iter(failed.items()))
+            messagebox.showerror("Error", f"Error during undo in {folder_path}: {str(error)}")
+        else:
             messagebox.showinfo("Success", "Undo completed successfully!")
 
-            # Clear history and disable undo button
-            self.last_rename_history = []
-            self.undo_button.config(state="disabled")
-
-            # Reload files
+        # Reload files if the undo touched the loaded folders
+        if self.tree and any(folder_path in self.tree.snapshots for folder_path in undone):
             self.load_files()
 
-        except Exception as e:
-            messagebox.showerror("Error", f"Error during undo: {str(e)}")
+        self.update_undo_button()
+
+    def update_undo_button(self):
+        """Enable undo while the journal holds renames that can be undone"""
+        undo_count = self.rename_journal.undo_count()
+        if undo_count:
+            self.undo_button.config(state="normal", text=f"Undo Last Rename ({undo_count})")
+        else:
+            self.undo_button.config(state="disabled", text="Undo Last Rename")
+
+    def recover_renames(self):
+        """Offer to finish or revert rename operations that were interrupted"""
+        for batches in group_incomplete(self.rename_journal):
+            file_count = sum(len(batch['plan']) for batch in batches)
+            where = batches[0]['folder'] if len(batches) == 1 else f"{len(batches)} folders"
+            choice = messagebox.askyesnocancel(
+                "Interrupted Rename",
+                f"A rename of {file_count} file(s) in\n{where}\nwas interrupted.\n\n"
+                "Yes: finish the rename\nNo: restore the original names\nCancel: decide next time"
+            )
+            if choice is None:
+                continue
+            _, failed = resume_batches(self.rename_journal, batches, roll_forward=choice)
+            if failed:
+                folder_path, error = next(iter(failed.items()))
+                messagebox.showerror("Error", f"Could not recover the interrupted rename in {folder_path}: {str(error)}")
+        self.update_undo_button()
 
     def load_recent_folders(self):
         """Load recent folders from file"""
@@ -550,12 +601,17 @@ class FileRenamerApp:
         self.folder_path = ""
         self.folder_label.config(text="No folder selected", foreground="gray")
         self.files = []
-        self.selected_files.clear()
-        self.file_tree.delete(*self.file_tree.get_children())
-        self.preview_tree.delete(*self.preview_tree.get_children())
+        self.tree = None
+        self.file_index = FileIndex([])
+        self.file_list.clear()
+        self.clear_preview()
         self.pattern_var.set("file")
         self.rename_mode_var.set("pattern")
-        self.filter_var.set("All Files")
+        self.filter_dropdown.config(values=[ALL_FILES])
+        self.filter_var.set(ALL_FILES)
+        self.search_var.set("")
+        self.recursive_var.set(False)
+        self.global_counter_var.set(False)
         self.sort_var.set("name")
         self.date_format_var.set("YYYYMMDD")
 
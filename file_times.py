@@ -0,0 +1,126 @@
+"""Portable file creation times for date sorting and date naming.
+
+os.stat() only has st_birthtime on macOS/BSD (and Windows from Python
+3.12); on Linux st_ctime is the inode change time, not creation. There
+the birth time is read with the statx() system call through ctypes,
+which works on kernels from 4.11 and filesystems that record it (ext4,
+btrfs, xfs). When no birth time is available, images fall back to their
+EXIF DateTimeOriginal and everything else to mtime.
+
+Loading a folder only stats: files without a birth time get 'ctime' None,
+and CreationTimes.fill() reads the fallbacks later for just the files a
+rename sorts or names by date, so EXIF isn't opened for a whole share
+when nobody asked for dates. Results are cached per folder by (device,
+inode, mtime), so reloading a folder after renaming files in it costs no
+further calls.
+"""
+import ctypes
+import os
+import struct
+import sys
+
+from rename_template import read_exif, exif_datetime
+
+EXIF_EXTENSIONS = {'.jpg', '.jpeg', '.tif', '.tiff', '.webp', '.png', '.heic'}
+
+AT_FDCWD = -100
+AT_STATX_DONT_SYNC = 0x4000  # don't force attribute sync on network filesystems
+STATX_BTIME = 0x800
+STATX_BUFFER_SIZE = 256
+STATX_BTIME_OFFSET = 80  # struct statx: stx_btime.tv_sec (s64), then tv_nsec (u32)
+
+
+def _load_statx():
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        statx = ctypes.CDLL(None, use_errno=True).statx  # glibc 2.28+
+    except (OSError, AttributeError):
+        return None
+    statx.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_int, ctypes.c_uint, ctypes.c_void_p]
+    statx.restype = ctypes.c_int
+    return statx
+
+
+_statx = _load_statx()
+
+
+def statx_birth_time(path, buffer=None):
+    """Birth time of path from statx(), or None if the kernel or filesystem lacks it"""
+    if _statx is None:
+        return None
+    if buffer is None:
+        buffer = ctypes.create_string_buffer(STATX_BUFFER_SIZE)
+    if _statx(AT_FDCWD, os.fsencode(path), AT_STATX_DONT_SYNC, STATX_BTIME, buffer) != 0:
+        return None
+    mask, = struct.unpack_from("I", buffer, 0)
+    if not mask & STATX_BTIME:
+        return None
+    seconds, nanoseconds = struct.unpack_from("qI", buffer, STATX_BTIME_OFFSET)
+    return seconds + nanoseconds / 1e9
+
+
+def _stat_birth_time(stat):
+    """Creation time available from an os.stat() result on this platform, or None"""
+    birth_time = getattr(stat, 'st_birthtime', None)
+    if birth_time is not None:
+        return birth_time
+    if os.name == 'nt':
+        return stat.st_ctime  # creation time on Windows before Python 3.12
+    return None
+
+
+def fallback_time(path, stat):
+    """EXIF DateTimeOriginal for images, otherwise the modification time"""
+    if os.path.splitext(path)[1].lower() in EXIF_EXTENSIONS:
+        taken = exif_datetime(read_exif(path))
+        if taken is not None:
+            return taken.timestamp()
+    return stat.st_mtime
+
+
+class CreationTimes:
+    def __init__(self):
+        self.cache = {}  # folder -> {(st_dev, st_ino, st_mtime_ns): timestamp, or None until filled}
+
+    def for_records(self, folder_path, records):
+        """Return {name: creation timestamp or None} for FileRecords of one folder.
+
+        Costs at most one statx() call per file not already cached. None
+        means the file has no birth time and needs fill() before use.
+        """
+        cached = self.cache.get(folder_path, {})
+        fresh = {}
+        times = {}
+        buffer = ctypes.create_string_buffer(STATX_BUFFER_SIZE)
+
+        for record in records:
+            key = (record.stat.st_dev, record.stat.st_ino, record.stat.st_mtime_ns)
+            if key in cached:
+                timestamp = cached[key]
+            else:
+                timestamp = _stat_birth_time(record.stat)
+                if timestamp is None:
+                    timestamp = statx_birth_time(record.path, buffer)
+            fresh[key] = timestamp
+            times[record.name] = timestamp
+
+        # Only files still in the folder stay cached
+        self.cache[folder_path] = fresh
+        return times
+
+    def fill(self, files):
+        """Set the fallback time on file dicts (with 'path' and 'folder') whose 'ctime' is still None"""
+        for file_info in files:
+            if file_info['ctime'] is not None:
+                continue
+            try:
+                stat = os.stat(file_info['path'], follow_symlinks=False)
+            except OSError:
+                continue  # gone since loading; the rename reports it
+            timestamp = fallback_time(file_info['path'], stat)
+            file_info['ctime'] = timestamp
+            cached = self.cache.get(file_info['folder'])
+            key = (stat.st_dev, stat.st_ino, stat.st_mtime_ns)
+            if cached is not None and key in cached:
+                cached[key] = timestamp
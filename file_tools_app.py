@@ -3,11 +3,41 @@ from tkinter import ttk, filedialog, messagebox
 from tkinterdnd2 import DND_FILES, TkinterDnD
 import os
 import json
-import hashlib
+import multiprocessing
+import queue
+import threading
+import time
 from datetime import datetime
 from pathlib import Path
 from collections import defaultdict
-from PIL import Image, ImageTk
+from PIL import ImageTk
+from duplicate_finder import collect_files, find_duplicates, link_groups, replace_with_hardlinks
+from file_times import CreationTimes
+from file_walker import list_files, walk_files, DEFAULT_EXCLUDED_DIRS
+from hash_cache import HashCache, DEFAULT_CACHE_FILE
+from hash_engine import HashEngine, DEFAULT_WORKERS, DEFAULT_PER_DEVICE
+from hashing import ALGORITHMS, DEFAULT_ALGORITHM
+from image_probe import ImageProbe
+from image_resizer import (resize_images, parse_renditions, check_outputs, split_rendition_outputs,
+                           DEFAULT_WORKERS as DEFAULT_RESIZE_WORKERS, DEFAULT_SPEED as DEFAULT_RESIZE_SPEED)
+from image_similarity import find_similar_images, HASH_FUNCTIONS, DEFAULT_THRESHOLD, IMAGE_EXTENSIONS
+from rename_engine import RenameEngine
+from rename_journal import RenameJournal
+from thumbnails import ThumbnailService
+from tree_rename import (FolderTree, plan_tree, flatten_plans, check_tree_conflicts, execute_tree,
+                         undo_batches, resume_batches, group_incomplete)
+from virtual_list import VirtualList
+
+# Milliseconds between checks for results from background workers
+SCAN_POLL_MS = 100
+# Quiet time after the last keystroke before the rename preview is refreshed
+LIVE_PREVIEW_DELAY_MS = 250
+# Milliseconds between checks for a thumbnail being made in the background
+THUMBNAIL_POLL_MS = 20
+# Rows on each side of the clicked one whose thumbnails are made in advance
+THUMBNAIL_PREFETCH_ROWS = 2
+IMAGE_PREVIEW_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.gif', '.bmp', '.webp', '.ico', '.tiff', '.heic'}
+RESIZER_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.gif', '.bmp', '.webp', '.tiff'}
 
 class FileToolsApp:
     VERSION = "2.0"
@@ -45,13 +75,22 @@ class FileToolsApp:
         self.init_image_resizer()
         self.init_log_viewer()
 
+        # Finish or revert renames interrupted by a crash once the window is up
+        self.root.after_idle(self.recover_renames)
+
     # ========== FILE RENAMER TAB ==========
     def init_file_renamer(self):
         # Store selected folder and files
         self.renamer_folder_path = ""
         self.renamer_files = []
-        self.renamer_selected_files = set()
-        self.last_rename_history = []
+        self.renamer_tree = None  # FolderTree of the folder (and subfolders) taken when it was loaded
+        self.creation_times = CreationTimes()
+        self.rename_plans = {}  # {folder_path: [(old_name, new_name)]} from the last preview
+        self.live_preview_job = None
+        try:
+            self.rename_journal = RenameJournal()  # crash recovery and undo that survives restarts
+        except OSError:
+            self.rename_journal = RenameJournal(None)
 
         # Recent folders tracking
         self.recent_folders_file = os.path.join(os.path.expanduser("~"), ".file_renamer_recent.json")
@@ -69,6 +108,7 @@ class FileToolsApp:
         ttk.Button(button_frame, text="Apply Rename", command=self.apply_rename).pack(side=tk.LEFT, padx=5)
         self.undo_button = ttk.Button(button_frame, text="Undo Last Rename", command=self.undo_rename, state="disabled")
         self.undo_button.pack(side=tk.LEFT, padx=5)
+        self.update_undo_button()
         ttk.Button(button_frame, text="Clear", command=self.clear_renamer).pack(side=tk.RIGHT, padx=5)
 
         # Folder selection section
@@ -98,21 +138,13 @@ class FileToolsApp:
         ttk.Button(select_button_frame, text="Select All", command=self.select_all).pack(side=tk.LEFT, padx=2)
         ttk.Button(select_button_frame, text="Deselect All", command=self.deselect_all).pack(side=tk.LEFT, padx=2)
 
-        # Scrollable file list
-        self.file_tree = ttk.Treeview(files_frame, columns=("Selected", "Type", "Name"), show="headings", height=6)
-        self.file_tree.heading("Selected", text="✓")
-        self.file_tree.heading("Type", text="Extension")
-        self.file_tree.heading("Name", text="Current Name")
-        self.file_tree.column("Selected", width=30, anchor="center")
-        self.file_tree.column("Type", width=80)
-        self.file_tree.column("Name", width=300)
-        self.file_tree.bind("<Button-1>", self.toggle_file_selection)
-        self.file_tree.bind("<<TreeviewSelect>>", self.on_file_selected)
-
-        scrollbar = ttk.Scrollbar(files_frame, orient=tk.VERTICAL, command=self.file_tree.yview)
-        self.file_tree.configure(yscroll=scrollbar.set)
-        self.file_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        # Scrollable file list (only the visible rows are drawn)
+        self.file_list = VirtualList(files_frame,
+                                     [("Selected", "✓", 30), ("Type", "Extension", 80), ("Name", "Current Name", 300)],
+                                     lambda file_info: (os.path.splitext(file_info['name'])[1], file_info['rel']),
+                                     height=6, on_activate=self.on_file_selected)
+        self.file_list.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.file_list.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
 
         # Right side: Image preview panel
         preview_panel = ttk.LabelFrame(content_frame, text="Image Preview", padding="10")
@@ -124,6 +156,8 @@ class FileToolsApp:
 
         # Store reference to prevent garbage collection
         self.current_preview_image = None
+        self.thumbnails = ThumbnailService()
+        self.thumbnail_request = None  # (path, Future) of the thumbnail being waited for
 
         # Rename options section
         options_frame = ttk.LabelFrame(left_frame, text="Rename Options", padding="10")
@@ -136,6 +170,7 @@ class FileToolsApp:
         self.rename_mode_var = tk.StringVar(value="pattern")
         ttk.Radiobutton(mode_frame, text="Pattern rename", variable=self.rename_mode_var, value="pattern", command=self.update_mode_ui).pack(side=tk.LEFT, padx=10)
         ttk.Radiobutton(mode_frame, text="Find & Replace", variable=self.rename_mode_var, value="find_replace", command=self.update_mode_ui).pack(side=tk.LEFT, padx=10)
+        ttk.Radiobutton(mode_frame, text="Template", variable=self.rename_mode_var, value="template", command=self.update_mode_ui).pack(side=tk.LEFT, padx=10)
 
         # Pattern input
         self.pattern_frame = ttk.Frame(options_frame)
@@ -154,28 +189,68 @@ class FileToolsApp:
         ttk.Label(self.find_replace_frame, text="Replace with:").pack(side=tk.LEFT, padx=(10, 0))
         self.replace_var = tk.StringVar()
         ttk.Entry(self.find_replace_frame, textvariable=self.replace_var, width=20).pack(side=tk.LEFT, padx=5)
+        self.find_regex_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(self.find_replace_frame, text="Regex", variable=self.find_regex_var).pack(side=tk.LEFT, padx=(10, 0))
+        self.ignore_case_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(self.find_replace_frame, text="Ignore case", variable=self.ignore_case_var).pack(side=tk.LEFT, padx=5)
+        self.whole_name_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(self.find_replace_frame, text="Match whole name", variable=self.whole_name_var).pack(side=tk.LEFT)
         self.find_replace_frame.pack_forget()
 
+        # Template inputs, e.g. {date:%Y%m%d}_{camera}_{n:05}{ext}
+        self.template_frame = ttk.Frame(options_frame)
+        self.template_frame.pack(fill=tk.X, pady=5)
+        ttk.Label(self.template_frame, text="Template:").pack(side=tk.LEFT)
+        self.template_var = tk.StringVar(value="{date:%Y%m%d}_{n:03}{ext}")
+        ttk.Entry(self.template_frame, textvariable=self.template_var, width=30).pack(side=tk.LEFT, padx=5)
+        ttk.Label(self.template_frame, text="Match regex:").pack(side=tk.LEFT, padx=(10, 0))
+        self.template_regex_var = tk.StringVar()
+        ttk.Entry(self.template_frame, textvariable=self.template_regex_var, width=15).pack(side=tk.LEFT, padx=5)
+        self.template_frame.pack_forget()
+
+        # Recursive renaming: each subfolder is planned and renamed on its own
+        scope_frame = ttk.Frame(options_frame)
+        scope_frame.pack(fill=tk.X, pady=5)
+        self.renamer_recursive_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(scope_frame, text="Include subfolders", variable=self.renamer_recursive_var,
+                        command=self.reload_renamer_files).pack(side=tk.LEFT)
+        self.global_counter_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(scope_frame, text="One counter across folders",
+                        variable=self.global_counter_var).pack(side=tk.LEFT, padx=10)
+
         # Preview section
         preview_frame = ttk.LabelFrame(left_frame, text="Rename Preview", padding="10")
         preview_frame.pack(fill=tk.BOTH, expand=True, pady=(10, 0))
 
-        self.preview_tree = ttk.Treeview(preview_frame, columns=("Old", "New"), show="headings", height=4)
-        self.preview_tree.heading("Old", text="Current Name")
-        self.preview_tree.heading("New", text="New Name")
-        self.preview_tree.column("Old", width=200)
-        self.preview_tree.column("New", width=200)
+        self.preview_status_label = ttk.Label(preview_frame, text="", foreground="gray")
+        self.preview_status_label.pack(side=tk.BOTTOM, fill=tk.X)
 
-        preview_scrollbar = ttk.Scrollbar(preview_frame, orient=tk.VERTICAL, command=self.preview_tree.yview)
-        self.preview_tree.configure(yscroll=preview_scrollbar.set)
-        self.preview_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-        preview_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        # Plan rows are (old_name, new_name); only the visible ones are drawn
+        self.preview_list = VirtualList(preview_frame, [("Old", "Current Name", 200), ("New", "New Name", 200)],
+                                        lambda pair: pair, height=4, checkable=False)
+        self.preview_list.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.preview_list.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+
+        # Refresh the preview while the user types
+        for var in (self.rename_mode_var, self.pattern_var, self.find_var, self.replace_var, self.find_regex_var,
+                    self.ignore_case_var, self.whole_name_var, self.template_var, self.template_regex_var,
+                    self.global_counter_var):
+            var.trace_add("write", self.schedule_live_preview)
 
     # ========== DUPLICATE FINDER TAB ==========
     def init_duplicate_finder(self):
         self.duplicate_folder_path = ""
         self.duplicates = {}  # {hash: [file_paths]}
+        self.duplicate_file_stats = {}  # {file_path: os.stat_result} for paths in self.duplicates
+        self.duplicate_group_of = {}  # {file_path: hash} for paths in self.duplicates
+        self.duplicate_algorithm = DEFAULT_ALGORITHM  # hash algorithm of the groups in self.duplicates
+        self.duplicate_tree_items = {}  # {hash or file_path: tree item id}
+        self.last_duplicate_stats = None
         self.selected_for_deletion = set()
+        self.hash_cache_file = DEFAULT_CACHE_FILE
+        self.duplicate_scanning = False
+        self.duplicate_scan_cancel = None
+        self.duplicate_scan_queue = None
 
         self.create_duplicate_finder_widgets()
 
@@ -184,9 +259,14 @@ class FileToolsApp:
         button_frame = ttk.Frame(self.duplicate_tab, padding="10")
         button_frame.pack(side=tk.BOTTOM, fill=tk.X)
 
-        ttk.Button(button_frame, text="Scan for Duplicates", command=self.scan_duplicates).pack(side=tk.LEFT, padx=5)
+        self.scan_duplicates_btn = ttk.Button(button_frame, text="Scan for Duplicates", command=self.scan_duplicates)
+        self.scan_duplicates_btn.pack(side=tk.LEFT, padx=5)
+        self.cancel_scan_btn = ttk.Button(button_frame, text="Cancel", command=self.cancel_duplicate_scan, state="disabled")
+        self.cancel_scan_btn.pack(side=tk.LEFT, padx=5)
         self.delete_duplicates_btn = ttk.Button(button_frame, text="Delete Selected", command=self.delete_duplicates, state="disabled")
         self.delete_duplicates_btn.pack(side=tk.LEFT, padx=5)
+        self.hardlink_duplicates_btn = ttk.Button(button_frame, text="Replace All with Hardlinks", command=self.hardlink_duplicates, state="disabled")
+        self.hardlink_duplicates_btn.pack(side=tk.LEFT, padx=5)
         ttk.Button(button_frame, text="Clear", command=self.clear_duplicates).pack(side=tk.RIGHT, padx=5)
 
         # Folder selection
@@ -198,12 +278,58 @@ class FileToolsApp:
         self.duplicate_folder_label.pack(side=tk.LEFT, padx=10)
         ttk.Button(folder_frame, text="Browse", command=self.browse_duplicate_folder).pack(side=tk.RIGHT)
 
+        # Scan mode
+        mode_frame = ttk.Frame(self.duplicate_tab, padding=(10, 0))
+        mode_frame.pack(fill=tk.X)
+        ttk.Label(mode_frame, text="Find:").pack(side=tk.LEFT)
+        self.duplicate_mode_var = tk.StringVar(value="identical")
+        ttk.Radiobutton(mode_frame, text="Identical files", variable=self.duplicate_mode_var,
+                        value="identical").pack(side=tk.LEFT, padx=10)
+        ttk.Radiobutton(mode_frame, text="Similar images", variable=self.duplicate_mode_var,
+                        value="similar").pack(side=tk.LEFT, padx=10)
+        ttk.Label(mode_frame, text="Max difference (bits):").pack(side=tk.LEFT, padx=(10, 0))
+        self.similarity_threshold_var = tk.IntVar(value=DEFAULT_THRESHOLD)
+        ttk.Spinbox(mode_frame, from_=0, to=32, textvariable=self.similarity_threshold_var, width=5).pack(side=tk.LEFT, padx=5)
+        ttk.Label(mode_frame, text="Method:").pack(side=tk.LEFT, padx=(10, 0))
+        self.similarity_method_var = tk.StringVar(value="dhash")
+        ttk.Combobox(mode_frame, textvariable=self.similarity_method_var, values=list(HASH_FUNCTIONS),
+                     state="readonly", width=8).pack(side=tk.LEFT, padx=5)
+
         # Options
         options_frame = ttk.Frame(self.duplicate_tab, padding="10")
         options_frame.pack(fill=tk.X)
 
         self.recursive_var = tk.BooleanVar(value=True)
         ttk.Checkbutton(options_frame, text="Search subfolders recursively", variable=self.recursive_var).pack(side=tk.LEFT)
+        self.verify_cache_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(options_frame, text="Verify hash cache (re-read files)", variable=self.verify_cache_var).pack(side=tk.LEFT, padx=10)
+        ttk.Button(options_frame, text="Clear Hash Cache", command=self.clear_hash_cache).pack(side=tk.RIGHT)
+
+        # Folders skipped while walking
+        exclude_frame = ttk.Frame(self.duplicate_tab, padding=(10, 0))
+        exclude_frame.pack(fill=tk.X)
+        ttk.Label(exclude_frame, text="Skip folders named:").pack(side=tk.LEFT)
+        self.exclude_dirs_var = tk.StringVar(value=", ".join(sorted(DEFAULT_EXCLUDED_DIRS)))
+        ttk.Entry(exclude_frame, textvariable=self.exclude_dirs_var, width=60).pack(side=tk.LEFT, padx=5)
+
+        # Hashing engine options
+        engine_frame = ttk.Frame(self.duplicate_tab, padding=(10, 0))
+        engine_frame.pack(fill=tk.X)
+
+        ttk.Label(engine_frame, text="Hash workers:").pack(side=tk.LEFT)
+        self.hash_workers_var = tk.IntVar(value=DEFAULT_WORKERS)
+        ttk.Spinbox(engine_frame, from_=1, to=64, textvariable=self.hash_workers_var, width=5).pack(side=tk.LEFT, padx=5)
+        ttk.Label(engine_frame, text="Max reads per disk:").pack(side=tk.LEFT, padx=(10, 0))
+        self.per_device_var = tk.IntVar(value=DEFAULT_PER_DEVICE)
+        ttk.Spinbox(engine_frame, from_=1, to=64, textvariable=self.per_device_var, width=5).pack(side=tk.LEFT, padx=5)
+        self.use_processes_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(engine_frame, text="Use process pool", variable=self.use_processes_var).pack(side=tk.LEFT, padx=10)
+
+        ttk.Label(engine_frame, text="Hash:").pack(side=tk.LEFT, padx=(10, 0))
+        self.hash_algorithm_labels = {label: name for name, (label, _) in ALGORITHMS.items()}
+        self.hash_algorithm_var = tk.StringVar(value=ALGORITHMS[DEFAULT_ALGORITHM][0])
+        ttk.Combobox(engine_frame, textvariable=self.hash_algorithm_var,
+                     values=list(self.hash_algorithm_labels), state="readonly", width=32).pack(side=tk.LEFT, padx=5)
 
         # Status label
         self.scan_status_label = ttk.Label(self.duplicate_tab, text="", foreground="gray")
@@ -240,100 +366,106 @@ class FileToolsApp:
 
     def load_renamer_files(self):
         self.renamer_files = []
-        self.renamer_selected_files = set()
-        self.file_tree.delete(*self.file_tree.get_children())
+        self.renamer_tree = None
+        self.clear_preview()
 
+        # One scan per folder; preview and apply reuse these stat results
         try:
-            for filename in sorted(os.listdir(self.renamer_folder_path)):
-                file_path = os.path.join(self.renamer_folder_path, filename)
-                if os.path.isfile(file_path) and not filename.startswith('.'):
-                    file_stat = os.stat(file_path)
+            self.renamer_tree = FolderTree.capture(self.renamer_folder_path,
+                                                   recursive=self.renamer_recursive_var.get())
+            for folder, snapshot in self.renamer_tree.snapshots.items():
+                ctimes = self.creation_times.for_records(folder, snapshot.records)
+                for record in snapshot.records:
                     self.renamer_files.append({
-                        'name': filename,
-                        'path': file_path,
-                        'created': file_stat.st_birthtime
+                        'name': record.name,
+                        'path': record.path,
+                        'size': record.stat.st_size,
+                        'ctime': ctimes[record.name],
+                        'folder': folder,
+                        'rel': self.renamer_tree.relative(folder, record.name)
                     })
-
-            for file_info in self.renamer_files:
-                filename = file_info['name']
-                ext = os.path.splitext(filename)[1]
-                self.file_tree.insert("", tk.END, values=("", ext, filename))
+            self.renamer_files.sort(key=lambda file_info: file_info['rel'])
         except Exception as e:
             messagebox.showerror("Error", f"Error loading files: {str(e)}")
 
-    def toggle_file_selection(self, event):
-        item = self.file_tree.identify_row(event.y)
-        if item:
-            values = self.file_tree.item(item, "values")
-            filename = values[2]
+        self.file_list.set_rows(self.renamer_files)
 
-            if filename in self.renamer_selected_files:
-                self.renamer_selected_files.remove(filename)
-                self.file_tree.item(item, values=("", values[1], values[2]))
-            else:
-                self.renamer_selected_files.add(filename)
-                self.file_tree.item(item, values=("✓", values[1], values[2]))
+    def reload_renamer_files(self):
+        """Reload the folder, e.g. after switching subfolders on or off"""
+        if self.renamer_folder_path:
+            self.load_renamer_files()
+
+    def selected_paths(self):
+        return {file_info['path'] for file_info in self.file_list.selected_rows()}
 
     def select_all(self):
-        for item in self.file_tree.get_children():
-            values = self.file_tree.item(item, "values")
-            filename = values[2]
-            self.renamer_selected_files.add(filename)
-            self.file_tree.item(item, values=("✓", values[1], values[2]))
+        self.file_list.select_all()
+        self.schedule_live_preview()
 
     def deselect_all(self):
-        self.renamer_selected_files.clear()
-        for item in self.file_tree.get_children():
-            values = self.file_tree.item(item, "values")
-            self.file_tree.item(item, values=("", values[1], values[2]))
-
-    def on_file_selected(self, event):
-        """Handle file selection and show image preview"""
-        selection = self.file_tree.selection()
-        if selection:
-            item = selection[0]
-            values = self.file_tree.item(item, "values")
-            filename = values[2]
-            file_path = os.path.join(self.renamer_folder_path, filename)
-
-            # Check if it's an image file
-            image_extensions = {'.jpg', '.jpeg', '.png', '.gif', '.bmp', '.webp', '.ico', '.tiff', '.heic'}
-            ext = os.path.splitext(filename)[1].lower()
-
-            if ext in image_extensions:
-                self.show_image_preview(file_path)
-            else:
-                self.clear_image_preview()
+        self.file_list.deselect_all()
+        self.schedule_live_preview()
+
+    def is_previewable(self, file_info):
+        return os.path.splitext(file_info['name'])[1].lower() in IMAGE_PREVIEW_EXTENSIONS
+
+    def on_file_selected(self, file_info):
+        """Show an image preview for the clicked file"""
+        self.schedule_live_preview()  # a click also toggles the file's check mark
+        if self.is_previewable(file_info):
+            self.show_image_preview(file_info['path'])
         else:
             self.clear_image_preview()
 
+        # Make the thumbnails of the rows around it while the user looks
+        self.thumbnails.prefetch([row['path'] for row in self.file_list.neighbor_rows(THUMBNAIL_PREFETCH_ROWS)
+                                  if self.is_previewable(row)])
+
     def show_image_preview(self, image_path):
-        """Display image thumbnail in preview panel"""
+        """Display image thumbnail in preview panel; thumbnails are made in the background"""
         try:
-            # Open and resize image
-            img = Image.open(image_path)
-
-            # Get dimensions for thumbnail (max 250x250)
-            max_size = (250, 250)
-            img.thumbnail(max_size, Image.Resampling.LANCZOS)
+            future = self.thumbnails.request(image_path)
+        except OSError as e:
+            self.show_image_error(e)
+            return
 
-            # Convert to PhotoImage
-            photo = ImageTk.PhotoImage(img)
+        self.thumbnail_request = (image_path, future)
+        if future.done():
+            self.poll_image_preview()
+        else:
+            self.image_preview_label.config(image="", text="Loading preview...", foreground="gray")
+            self.current_preview_image = None
+            self.root.after(THUMBNAIL_POLL_MS, self.poll_image_preview)
 
-            # Update label
-            self.image_preview_label.config(image=photo, text="")
-            self.current_preview_image = photo  # Keep reference
+    def poll_image_preview(self):
+        """Show the requested thumbnail once it is ready"""
+        if self.thumbnail_request is None:
+            return
+        image_path, future = self.thumbnail_request
+        if not future.done():
+            self.root.after(THUMBNAIL_POLL_MS, self.poll_image_preview)
+            return
+        self.thumbnail_request = None
 
+        try:
+            photo = ImageTk.PhotoImage(future.result())
         except Exception as e:
-            self.image_preview_label.config(
-                image="",
-                text=f"Could not load image:\n{str(e)[:50]}",
-                foreground="red"
-            )
-            self.current_preview_image = None
+            self.show_image_error(e)
+            return
+        self.image_preview_label.config(image=photo, text="")
+        self.current_preview_image = photo  # Keep reference
+
+    def show_image_error(self, error):
+        self.image_preview_label.config(
+            image="",
+            text=f"Could not load image:\n{str(error)[:50]}",
+            foreground="red"
+        )
+        self.current_preview_image = None
 
     def clear_image_preview(self):
         """Clear the image preview"""
+        self.thumbnail_request = None
         self.image_preview_label.config(
             image="",
             text="Select an image file\nto see preview",
@@ -343,97 +475,198 @@ class FileToolsApp:
 
     def update_mode_ui(self):
         mode = self.rename_mode_var.get()
-        if mode == "pattern":
-            self.pattern_frame.pack(fill=tk.X, pady=5)
-            self.find_replace_frame.pack_forget()
-        elif mode == "find_replace":
-            self.find_replace_frame.pack(fill=tk.X, pady=5)
-            self.pattern_frame.pack_forget()
+        frames = {"pattern": self.pattern_frame, "find_replace": self.find_replace_frame,
+                  "template": self.template_frame}
+        for frame_mode, frame in frames.items():
+            if frame_mode == mode:
+                frame.pack(fill=tk.X, pady=5)
+            else:
+                frame.pack_forget()
+
+    def make_rename_engine(self):
+        """Build a RenameEngine from the current options"""
+        return RenameEngine(
+            mode=self.rename_mode_var.get(),
+            pattern=self.pattern_var.get(),
+            find_text=self.find_var.get(),
+            replace_text=self.replace_var.get(),
+            sort_order=None,  # keep folder listing order
+            template=self.template_var.get(),
+            template_regex=self.template_regex_var.get(),
+            find_regex=self.find_regex_var.get(),
+            ignore_case=self.ignore_case_var.get(),
+            whole_name=self.whole_name_var.get()
+        )
 
-    def preview_changes(self):
-        self.preview_tree.delete(*self.preview_tree.get_children())
+    def make_rename_plans(self):
+        """Plan the selected files folder by folder: {folder_path: [(old_name, new_name)]}"""
+        engine = self.make_rename_engine()
+        selected = self.selected_paths()
+        if engine.uses_creation_time():
+            # Creation-time fallbacks (EXIF) are read only for the files being renamed
+            self.creation_times.fill(f for f in self.renamer_files if f['path'] in selected)
+        return plan_tree(engine, self.renamer_files, selected, global_counter=self.global_counter_var.get())
+
+    def show_preview(self, rename_plans):
+        """Show the plans in the preview list and return (has_conflict, message)"""
+        self.rename_plans = rename_plans
+        rename_plan = flatten_plans(self.renamer_tree, rename_plans)
+        self.preview_list.update_rows(rename_plan)
+
+        has_conflict, conflict_msg = check_tree_conflicts(self.renamer_tree, rename_plans)
+        if has_conflict:
+            self.preview_status_label.config(text=conflict_msg, foreground="red")
+        else:
+            status = f"{len(rename_plan)} file(s) will be renamed"
+            if len(rename_plans) > 1:
+                status += f" in {len(rename_plans)} folders"
+            self.preview_status_label.config(text=status, foreground="gray")
+        return has_conflict, conflict_msg
+
+    def clear_preview(self):
+        self.rename_plans = {}
+        self.preview_list.clear()
+        self.preview_status_label.config(text="")
 
-        if not self.renamer_selected_files:
+    def preview_changes(self):
+        if not self.file_list.has_selection():
+            self.clear_preview()
             messagebox.showwarning("No Files Selected", "Please select files to rename")
             return
 
-        selected = [f for f in self.renamer_files if f['name'] in self.renamer_selected_files]
-        mode = self.rename_mode_var.get()
-
-        for index, file_info in enumerate(selected):
-            old_name = file_info['name']
-            base_name, ext = os.path.splitext(old_name)
-
-            if mode == "find_replace":
-                find_text = self.find_var.get()
-                replace_text = self.replace_var.get()
-                new_base_name = base_name.replace(find_text, replace_text)
-                new_name = f"{new_base_name}{ext}"
-            else:  # pattern mode
-                pattern = self.pattern_var.get()
-                new_name = f"{pattern}_{str(index+1).zfill(3)}{ext}"
+        try:
+            rename_plans = self.make_rename_plans()
+        except ValueError as e:
+            self.clear_preview()
+            messagebox.showerror("Invalid Rename Options", str(e))
+            return
 
-            self.preview_tree.insert("", tk.END, values=(old_name, new_name))
+        has_conflict, conflict_msg = self.show_preview(rename_plans)
+        if has_conflict:
+            messagebox.showwarning("Naming Conflict", conflict_msg)
+
+    def schedule_live_preview(self, *args):
+        """Debounce typing: preview once the options have been still for a moment"""
+        # The stored plan is stale until the preview is rebuilt, so Apply can't run it
+        self.rename_plans = {}
+        if self.live_preview_job is not None:
+            self.root.after_cancel(self.live_preview_job)
+        self.live_preview_job = self.root.after(LIVE_PREVIEW_DELAY_MS, self.live_preview)
+
+    def live_preview(self):
+        """Quietly re-plan the selected files; unchanged preview lines are not redrawn"""
+        self.live_preview_job = None
+        if not self.file_list.has_selection():
+            self.clear_preview()
+            return
+        try:
+            rename_plans = self.make_rename_plans()
+        except ValueError as e:
+            # Drop the last valid plan so it can't be applied under invalid options
+            self.clear_preview()
+            self.preview_status_label.config(text=str(e), foreground="red")
+            return
+        self.show_preview(rename_plans)
 
     def apply_rename(self):
-        if not self.renamer_selected_files:
+        if not self.file_list.has_selection():
             messagebox.showwarning("No Files Selected", "Please select files to rename")
             return
 
-        # Check for conflicts
-        preview_items = self.preview_tree.get_children()
-        if not preview_items:
+        if not self.rename_plans:
             messagebox.showwarning("No Preview", "Please preview changes first")
             return
 
-        new_names = [self.preview_tree.item(item)["values"][1] for item in preview_items]
-        if len(new_names) != len(set(new_names)):
-            messagebox.showerror("Conflict", "Some files would have duplicate names!")
+        # Check for conflicts
+        has_conflict, conflict_msg = check_tree_conflicts(self.renamer_tree, self.rename_plans)
+        if has_conflict:
+            messagebox.showerror("Conflict", conflict_msg)
             return
 
-        # Perform rename
-        self.last_rename_history = []
-        try:
-            for item in preview_items:
-                values = self.preview_tree.item(item)["values"]
-                old_name, new_name = values[0], values[1]
-                old_path = os.path.join(self.renamer_folder_path, old_name)
-                new_path = os.path.join(self.renamer_folder_path, new_name)
+        # The plans were made from the snapshots taken at load; one stat per
+        # folder tells whether they still match what is on disk
+        if not self.renamer_tree or not self.renamer_tree.is_current():
+            selected = self.selected_paths()
+            self.load_renamer_files()
+            self.file_list.select_rows(lambda file_info: file_info['path'] in selected)
+            messagebox.showwarning("Folder Changed",
+                                   "Files in the folder changed since it was loaded. "
+                                   "The list has been refreshed; please preview again.")
+            return
 
-                os.rename(old_path, new_path)
-                self.last_rename_history.append((new_path, old_path))
+        # Perform rename; each folder's swaps and chains are ordered safely and
+        # journaled, folders run in parallel, and a failing folder is rolled back
+        renamed, failed = execute_tree(self.renamer_tree, self.rename_plans, journal=self.rename_journal)
 
-                # Log the rename
+        file_count = 0
+        for folder_path in renamed:
+            plan = {folder_path: self.rename_plans[folder_path]}
+            for old_name, new_name in flatten_plans(self.renamer_tree, plan):
                 self.add_log("rename", f"'{old_name}' → '{new_name}'")
+            file_count += len(plan[folder_path])
 
-            messagebox.showinfo("Success", f"Renamed {len(preview_items)} files")
-            self.undo_button.config(state="normal")
-            self.load_renamer_files()
-            self.preview_tree.delete(*self.preview_tree.get_children())
-        except Exception as e:
-            messagebox.showerror("Error", f"Error renaming files: {str(e)}")
+        if failed:
+            folder_path, error = next(iter(failed.items()))
+            messagebox.showerror("Error",
+                f"Renamed {file_count} files, but {len(failed)} folder(s) were left unchanged.\n\n"
+                f"{folder_path}: {error}")
+        else:
+            messagebox.showinfo("Success", f"Renamed {file_count} files")
+        self.update_undo_button()
+        self.load_renamer_files()
 
     def undo_rename(self):
-        if not self.last_rename_history:
+        batches = self.rename_journal.last_undoable()
+        if not batches:
             return
 
-        try:
-            for new_path, old_path in self.last_rename_history:
-                os.rename(new_path, old_path)
-
+        # Files removed since the rename are skipped
+        undone, failed = undo_batches(self.rename_journal, batches)
+        if failed:
+            folder_path, error = next(iter(failed.items()))
+            messagebox.showerror("Error", f"Error during undo in {folder_path}: {str(error)}")
+        else:
             messagebox.showinfo("Undo", "Rename operation undone")
-            self.undo_button.config(state="disabled")
+        if self.renamer_tree and any(folder_path in self.renamer_tree.snapshots for folder_path in undone):
             self.load_renamer_files()
-        except Exception as e:
-            messagebox.showerror("Error", f"Error during undo: {str(e)}")
+        self.update_undo_button()
+
+    def update_undo_button(self):
+        undo_count = self.rename_journal.undo_count()
+        if undo_count:
+            self.undo_button.config(state="normal", text=f"Undo Last Rename ({undo_count})")
+        else:
+            self.undo_button.config(state="disabled", text="Undo Last Rename")
+
+    def recover_renames(self):
+        """Offer to finish or revert rename operations that were interrupted"""
+        for batches in group_incomplete(self.rename_journal):
+            file_count = sum(len(batch['plan']) for batch in batches)
+            where = batches[0]['folder'] if len(batches) == 1 else f"{len(batches)} folders"
+            choice = messagebox.askyesnocancel(
+                "Interrupted Rename",
+                f"A rename of {file_count} file(s) in\n{where}\nwas interrupted.\n\n"
+                "Yes: finish the rename\nNo: restore the original names\nCancel: decide next time"
+            )
+            if choice is None:
+                continue
+            recovered, failed = resume_batches(self.rename_journal, batches, roll_forward=choice)
+            action = "Finished" if choice else "Reverted"
+            for batch in batches:
+                if batch['folder'] in recovered:
+                    self.add_log("rename", f"{action} interrupted rename of {len(batch['plan'])} file(s) in {batch['folder']}")
+            if failed:
+                folder_path, error = next(iter(failed.items()))
+                messagebox.showerror("Error", f"Could not recover the interrupted rename in {folder_path}: {str(error)}")
+        self.update_undo_button()
 
     def clear_renamer(self):
         self.renamer_folder_path = ""
         self.renamer_folder_label.config(text="No folder selected", foreground="gray")
         self.renamer_files = []
-        self.renamer_selected_files.clear()
-        self.file_tree.delete(*self.file_tree.get_children())
-        self.preview_tree.delete(*self.preview_tree.get_children())
+        self.renamer_tree = None
+        self.file_list.clear()
+        self.clear_preview()
 
     def load_recent_folders(self):
         try:
@@ -455,72 +688,302 @@ class FileToolsApp:
         if not self.duplicate_folder_path:
             messagebox.showwarning("No Folder", "Please select a folder to scan")
             return
+        if self.duplicate_scanning:
+            return
 
-        self.duplicate_tree.delete(*self.duplicate_tree.get_children())
-        self.duplicates = {}
-        self.selected_for_deletion = set()
-        self.scan_status_label.config(text="Scanning...")
-        self.root.update()
+        self.reset_duplicate_results()
+        self.delete_duplicates_btn.config(state="disabled")
+        self.hardlink_duplicates_btn.config(state="disabled")
+        self.scan_duplicates_btn.config(state="disabled")
+        self.cancel_scan_btn.config(state="normal")
+        self.scan_status_label.config(text="Scanning folders...")
+
+        # Read all Tk variables here; the worker thread must not touch Tk
+        options = {
+            'mode': self.duplicate_mode_var.get(),
+            'threshold': self.similarity_threshold_var.get(),
+            'method': self.similarity_method_var.get(),
+            'folder': self.duplicate_folder_path,
+            'recursive': self.recursive_var.get(),
+            'exclude_dirs': {name.strip() for name in self.exclude_dirs_var.get().split(",") if name.strip()},
+            'verify': self.verify_cache_var.get(),
+            'workers': self.hash_workers_var.get(),
+            'use_processes': self.use_processes_var.get(),
+            'per_device': self.per_device_var.get(),
+            'algorithm': self.hash_algorithm_labels[self.hash_algorithm_var.get()],
+        }
+        self.duplicate_algorithm = options['algorithm']
+
+        self.duplicate_scan_cancel = threading.Event()
+        self.duplicate_scan_queue = queue.Queue()
+        self.duplicate_scanning = True
+        threading.Thread(
+            target=self.duplicate_scan_worker,
+            args=(options, self.duplicate_scan_cancel, self.duplicate_scan_queue),
+            daemon=True
+        ).start()
+        self.root.after(SCAN_POLL_MS, self.poll_duplicate_scan, self.duplicate_scan_queue)
+
+    def duplicate_scan_worker(self, options, cancel_event, results):
+        """Walk and hash in a background thread, posting messages to results"""
+        try:
+            if options['mode'] == "similar":
+                self.similar_scan_worker(options, cancel_event, results)
+                return
 
-        # Hash all files
-        file_hashes = defaultdict(list)
-        file_count = 0
+            file_stats = collect_files(options['folder'], options['recursive'], cancel_event,
+                                       options['exclude_dirs'])
+            results.put(("walked", len(file_stats)))
 
+            cache = HashCache(self.hash_cache_file)
+            engine = HashEngine(workers=options['workers'],
+                                use_processes=options['use_processes'],
+                                per_device_limit=options['per_device'])
+            try:
+                _, stats = find_duplicates(
+                    file_stats, cache=cache, verify=options['verify'], engine=engine,
+                    algorithm=options['algorithm'], cancel_event=cancel_event,
+                    on_group=lambda file_hash, paths: results.put(
+                        ("group", file_hash, paths, {path: file_stats[path] for path in paths})),
+                    on_progress=lambda stats: results.put(("progress", dict(stats)))
+                )
+            finally:
+                engine.close(wait=not cancel_event.is_set())
+                cache.close()
+
+            results.put(("done", stats))
+        except Exception as e:
+            results.put(("error", str(e)))
+
+    def similar_scan_worker(self, options, cancel_event, results):
+        """Find perceptually similar images; runs on the scan worker thread"""
+        file_stats = {record.path: record.stat
+                      for record in walk_files(options['folder'], recursive=options['recursive'],
+                                               exclude_dirs=options['exclude_dirs'],
+                                               extensions=IMAGE_EXTENSIONS, cancel_event=cancel_event)}
+        results.put(("walked", len(file_stats)))
+
+        cache = HashCache(self.hash_cache_file)
+        # Decoding images is CPU-bound, so always use processes here
+        engine = HashEngine(workers=options['workers'], use_processes=True,
+                            per_device_limit=options['per_device'])
         try:
-            if self.recursive_var.get():
-                # Recursive scan
-                for root, dirs, files in os.walk(self.duplicate_folder_path):
-                    for filename in files:
-                        if not filename.startswith('.'):
-                            file_path = os.path.join(root, filename)
-                            file_hash = self.hash_file(file_path)
-                            if file_hash:
-                                file_hashes[file_hash].append(file_path)
-                                file_count += 1
-            else:
-                # Non-recursive scan
-                for filename in os.listdir(self.duplicate_folder_path):
-                    file_path = os.path.join(self.duplicate_folder_path, filename)
-                    if os.path.isfile(file_path) and not filename.startswith('.'):
-                        file_hash = self.hash_file(file_path)
-                        if file_hash:
-                            file_hashes[file_hash].append(file_path)
-                            file_count += 1
-
-            # Find duplicates (hashes with multiple files)
-            self.duplicates = {h: paths for h, paths in file_hashes.items() if len(paths) > 1}
-
-            # Display results
-            if self.duplicates:
-                for file_hash, paths in self.duplicates.items():
-                    # Create parent node for this duplicate group
-                    parent = self.duplicate_tree.insert("", tk.END, text=f"Duplicate Group ({len(paths)} copies)", values=("", "", ""))
-
-                    for path in paths:
-                        filename = os.path.basename(path)
-                        size = os.path.getsize(path)
-                        size_str = self.format_size(size)
-                        self.duplicate_tree.insert(parent, tk.END, text=filename, values=("", path, size_str))
-
-                total_duplicates = sum(len(paths) - 1 for paths in self.duplicates.values())
-                self.scan_status_label.config(text=f"Found {len(self.duplicates)} duplicate groups ({total_duplicates} duplicate files)")
-            else:
-                self.scan_status_label.config(text=f"No duplicates found (scanned {file_count} files)")
+            groups, stats = find_similar_images(
+                file_stats, threshold=options['threshold'], method=options['method'], cache=cache,
+                engine=engine, cancel_event=cancel_event,
+                on_progress=lambda stats: results.put(("progress", dict(stats)))
+            )
+        finally:
+            engine.close(wait=not cancel_event.is_set())
+            cache.close()
 
-        except Exception as e:
-            messagebox.showerror("Error", f"Error scanning for duplicates: {str(e)}")
-            self.scan_status_label.config(text="Error during scan")
+        for index, paths in enumerate(groups):
+            results.put(("group", f"similar-{index}", paths, {path: file_stats[path] for path in paths}))
+        results.put(("done", stats))
+
+    def poll_duplicate_scan(self, results):
+        """Apply messages from the scan worker to the UI"""
+        if results is not self.duplicate_scan_queue:
+            return  # the scan was cleared, drop its remaining messages
 
-    def hash_file(self, file_path):
-        """Calculate MD5 hash of file"""
+        finished = False
         try:
-            hasher = hashlib.md5()
-            with open(file_path, 'rb') as f:
-                while chunk := f.read(8192):
-                    hasher.update(chunk)
-            return hasher.hexdigest()
-        except:
-            return None
+            while True:
+                message = results.get_nowait()
+                kind = message[0]
+
+                if kind == "walked":
+                    self.scan_status_label.config(text=f"Found {message[1]} files, hashing candidates...")
+                elif kind == "group":
+                    _, file_hash, paths, group_stats = message
+                    self.duplicate_file_stats.update(group_stats)
+                    self.insert_duplicate_group(file_hash, paths)
+                elif kind == "progress":
+                    self.scan_status_label.config(text=self.format_scan_progress(message[1]))
+                elif kind == "done":
+                    self.last_duplicate_stats = message[1]
+                    self.update_duplicate_summary()
+                    finished = True
+                elif kind == "error":
+                    messagebox.showerror("Error", f"Error scanning for duplicates: {message[1]}")
+                    self.scan_status_label.config(text="Error during scan")
+                    finished = True
+        except queue.Empty:
+            pass
+
+        if finished:
+            self.duplicate_scanning = False
+            self.scan_duplicates_btn.config(state="normal")
+            self.update_hardlink_button()
+            self.cancel_scan_btn.config(state="disabled")
+        else:
+            self.root.after(SCAN_POLL_MS, self.poll_duplicate_scan, results)
+
+    def cancel_duplicate_scan(self):
+        """Stop the running scan, keeping the groups found so far"""
+        if self.duplicate_scan_cancel:
+            self.duplicate_scan_cancel.set()
+            self.cancel_scan_btn.config(state="disabled")
+            self.scan_status_label.config(text="Cancelling...")
+
+    def update_duplicate_summary(self):
+        """Show the result counts for the current groups and the last scan's stats"""
+        stats = self.last_duplicate_stats
+        if stats is None:
+            return
+
+        total_duplicates = sum(len(paths) - 1 for paths in self.duplicates.values())
+        if 'groups' in stats:
+            summary = (f"Found {len(self.duplicates)} groups of similar images"
+                       if self.duplicates else "No similar images found")
+            details = f"Compared {stats['files']} images ({stats['cache_hits']} cache hits)"
+        else:
+            if self.duplicates:
+                summary = f"Found {len(self.duplicates)} duplicate groups ({total_duplicates} duplicate files)"
+            else:
+                summary = "No duplicates found"
+            details = self.format_scan_stats(stats)
+        if stats.get('cancelled'):
+            summary = f"Scan cancelled - partial results. {summary}"
+        self.scan_status_label.config(text=f"{summary}\n{details}")
+
+    def update_hardlink_button(self):
+        # Similar images are not identical, so they must never be hardlinked together
+        can_link = self.duplicates and not any(h.startswith("similar-") for h in self.duplicates)
+        self.hardlink_duplicates_btn.config(state="normal" if can_link else "disabled")
+
+    def reset_duplicate_results(self):
+        """Forget all groups and empty the results tree"""
+        self.duplicate_tree.delete(*self.duplicate_tree.get_children())
+        self.duplicates = {}
+        self.duplicate_file_stats = {}
+        self.duplicate_group_of = {}
+        self.duplicate_tree_items = {}
+        self.last_duplicate_stats = None
+        self.selected_for_deletion = set()
+
+    def insert_duplicate_group(self, group_key, paths):
+        """Add one duplicate group to the results tree"""
+        self.duplicates[group_key] = paths
+        parent = self.duplicate_tree.insert("", tk.END, text="", values=("", "", ""))
+        self.duplicate_tree_items[group_key] = parent
+
+        for path in paths:
+            size_str = self.format_size(self.duplicate_file_stats[path].st_size)
+            item = self.duplicate_tree.insert(parent, tk.END, text="", values=("", path, size_str))
+            self.duplicate_tree_items[path] = item
+            self.duplicate_group_of[path] = group_key
+
+        self.label_duplicate_group(group_key)
+
+    def label_duplicate_group(self, group_key):
+        """Set the group title and row names, marking paths that are hardlinks"""
+        paths = self.duplicates[group_key]
+        copies = link_groups(paths, self.duplicate_file_stats)
+        if group_key.startswith("similar-"):
+            title = f"Similar Images ({len(paths)} images)"
+        elif len(copies) != len(paths):
+            title = f"Duplicate Group ({len(copies)} copies, {len(paths)} paths)"
+        else:
+            title = f"Duplicate Group ({len(copies)} copies)"
+        self.duplicate_tree.item(self.duplicate_tree_items[group_key], text=title)
+
+        for copy in copies:
+            for path in copy:
+                # Hardlinks share one copy of the data; deleting one frees nothing
+                filename = os.path.basename(path)
+                if len(copy) > 1:
+                    filename = f"{filename} (hardlink x{len(copy)})"
+                self.duplicate_tree.item(self.duplicate_tree_items[path], text=filename)
+
+    def update_duplicate_groups(self, removed=(), changed=()):
+        """Update groups in place after files were removed or relinked.
+
+        removed paths are dropped; changed paths had their entry in
+        self.duplicate_file_stats replaced. Groups left with fewer than two
+        distinct copies are collapsed. No disk access is needed.
+        """
+        removed = set(removed)
+        affected = {self.duplicate_group_of[path] for path in removed | set(changed)
+                    if path in self.duplicate_group_of}
+
+        for path in removed:
+            if path in self.duplicate_group_of:
+                del self.duplicate_group_of[path]
+                self.duplicate_tree.delete(self.duplicate_tree_items.pop(path))
+                self.duplicate_file_stats.pop(path, None)
+                self.selected_for_deletion.discard(path)
+
+        for group_key in affected:
+            paths = [path for path in self.duplicates[group_key] if path not in removed]
+            if group_key.startswith("similar-"):
+                still_duplicates = len(paths) > 1
+            else:
+                still_duplicates = len(link_groups(paths, self.duplicate_file_stats)) > 1
+
+            if still_duplicates:
+                self.duplicates[group_key] = paths
+                self.label_duplicate_group(group_key)
+                continue
+
+            del self.duplicates[group_key]
+            self.duplicate_tree.delete(self.duplicate_tree_items.pop(group_key))
+            for path in paths:
+                del self.duplicate_group_of[path]
+                del self.duplicate_tree_items[path]
+                self.duplicate_file_stats.pop(path, None)
+                self.selected_for_deletion.discard(path)
+
+        self.update_duplicate_summary()
+        self.update_hardlink_button()
+        self.delete_duplicates_btn.config(state="normal" if self.selected_for_deletion else "disabled")
+
+    def format_scan_progress(self, stats):
+        """Describe hashing progress with throughput and ETA"""
+        elapsed = max(time.monotonic() - stats['started'], 1e-6)
+        files_rate = stats['hashed_files'] / elapsed
+        bytes_rate = stats['hashed_bytes'] / elapsed
+        remaining = max(stats['expected_bytes'] - stats['hashed_bytes'], 0)
+        eta = self.format_duration(remaining / bytes_rate) if bytes_rate > 0 else "--"
+        return (f"Hashing {stats['hashed_files']}/{stats['expected_files']} files - "
+                f"{files_rate:.0f} files/s, {self.format_size(bytes_rate)}/s - ETA {eta}\n"
+                f"{len(self.duplicates)} duplicate groups so far")
+
+    def format_duration(self, seconds):
+        """Format a duration in seconds as e.g. 1h 02m, 3m 05s or 12s"""
+        seconds = int(seconds)
+        if seconds >= 3600:
+            return f"{seconds // 3600}h {seconds % 3600 // 60:02d}m"
+        if seconds >= 60:
+            return f"{seconds // 60}m {seconds % 60:02d}s"
+        return f"{seconds}s"
+
+    def format_scan_stats(self, stats):
+        """Describe how many files each pipeline stage had to touch"""
+        links = f" (+{stats['hardlinked_paths']} hardlinks)" if stats['hardlinked_paths'] else ""
+        return (f"Scanned {stats['files']} files{links}: "
+                f"{stats['files'] - stats['size_candidates']} ruled out by size, "
+                f"{stats['partial_hashed']} sample-hashed, "
+                f"{stats['full_hashed']} fully hashed "
+                f"(read {self.format_size(stats['bytes_read'])} of {self.format_size(stats['total_bytes'])}, "
+                f"{stats['cache_hits']} cache hits"
+                + (f", {stats['cache_mismatches']} stale entries fixed" if self.verify_cache_var.get() else "")
+                + ")")
+
+    def clear_hash_cache(self):
+        """Delete all cached file hashes"""
+        response = messagebox.askyesno(
+            "Clear Hash Cache",
+            "Remove all cached file hashes?\nThe next scan will re-read every candidate file."
+        )
+        if response:
+            try:
+                cache = HashCache(self.hash_cache_file)
+                cache.clear()
+                cache.close()
+                messagebox.showinfo("Cache Cleared", "Hash cache has been cleared.")
+            except Exception as e:
+                messagebox.showerror("Error", f"Error clearing hash cache: {str(e)}")
 
     def format_size(self, size_bytes):
         """Format file size in human-readable format"""
@@ -559,28 +1022,71 @@ class FileToolsApp:
         )
 
         if response:
-            deleted_count = 0
+            deleted = []
             try:
                 for file_path in self.selected_for_deletion:
                     os.remove(file_path)
-                    deleted_count += 1
+                    deleted.append(file_path)
 
                     # Log the deletion
                     self.add_log("delete", f"Deleted duplicate: {file_path}")
 
-                messagebox.showinfo("Success", f"Deleted {deleted_count} files")
-                self.scan_duplicates()  # Rescan
+                messagebox.showinfo("Success", f"Deleted {len(deleted)} files")
             except Exception as e:
                 messagebox.showerror("Error", f"Error deleting files: {str(e)}")
+            finally:
+                # Drop what is gone from the results instead of rescanning
+                self.update_duplicate_groups(removed=deleted)
+
+    def hardlink_duplicates(self):
+        """Replace every duplicate copy with a hardlink to one kept copy"""
+        if not self.duplicates:
+            return
+
+        reclaimable = 0
+        for paths in self.duplicates.values():
+            copies = link_groups(paths, self.duplicate_file_stats)
+            devices = {self.duplicate_file_stats[copy[0]].st_dev for copy in copies}
+            reclaimable += (len(copies) - len(devices)) * self.duplicate_file_stats[paths[0]].st_size
+
+        response = messagebox.askyesno(
+            "Replace with Hardlinks",
+            f"Replace the duplicate copies in {len(self.duplicates)} groups with hardlinks to one copy each?\n"
+            f"Up to {self.format_size(reclaimable)} can be reclaimed. All paths keep working, "
+            f"but they will share the same data afterwards."
+        )
+        if not response:
+            return
+
+        try:
+            replaced, errors, bytes_freed = replace_with_hardlinks(self.duplicates, self.duplicate_file_stats,
+                                                                   self.duplicate_algorithm)
+            for path, keeper in replaced:
+                self.duplicate_file_stats[path] = self.duplicate_file_stats[keeper]
+                self.add_log("link", f"Replaced '{path}' with hardlink to '{keeper}'")
+            self.update_duplicate_groups(changed=[path for path, _ in replaced])
+
+            message = f"Replaced {len(replaced)} files with hardlinks, freeing {self.format_size(bytes_freed)}"
+            if errors:
+                message += f"\n{len(errors)} files could not be replaced, e.g.:\n" + "\n".join(
+                    f"{path}: {error}" for path, error in errors[:5])
+                messagebox.showwarning("Hardlinks", message)
+            else:
+                messagebox.showinfo("Success", message)
+        except Exception as e:
+            messagebox.showerror("Error", f"Error replacing files with hardlinks: {str(e)}")
 
     def clear_duplicates(self):
+        self.cancel_duplicate_scan()
+        self.duplicate_scan_queue = None
+        self.duplicate_scanning = False
+        self.scan_duplicates_btn.config(state="normal")
         self.duplicate_folder_path = ""
         self.duplicate_folder_label.config(text="No folder selected", foreground="gray")
-        self.duplicates = {}
-        self.selected_for_deletion = set()
-        self.duplicate_tree.delete(*self.duplicate_tree.get_children())
+        self.reset_duplicate_results()
         self.scan_status_label.config(text="")
         self.delete_duplicates_btn.config(state="disabled")
+        self.hardlink_duplicates_btn.config(state="disabled")
 
     # ========== FOLDER ORGANIZER TAB ==========
     def init_folder_organizer(self):
@@ -652,10 +1158,7 @@ class FileToolsApp:
     def load_organizer_files(self):
         self.organizer_files = []
         try:
-            for filename in os.listdir(self.organizer_folder_path):
-                file_path = os.path.join(self.organizer_folder_path, filename)
-                if os.path.isfile(file_path) and not filename.startswith('.'):
-                    self.organizer_files.append(file_path)
+            self.organizer_files = list_files(self.organizer_folder_path)
 
             self.organize_status_label.config(text=f"Loaded {len(self.organizer_files)} files")
         except Exception as e:
@@ -703,16 +1206,16 @@ class FileToolsApp:
         mode = self.organize_mode_var.get()
 
         try:
-            for file_path in self.organizer_files:
-                filename = os.path.basename(file_path)
-                ext = os.path.splitext(filename)[1]
+            for record in self.organizer_files:
+                file_path = record.path
+                ext = os.path.splitext(record.name)[1]
 
                 if mode == "type":
                     folder_name = self.get_file_category(ext)
                 elif mode == "extension":
                     folder_name = ext[1:] if ext else "no_extension"
                 else:  # date
-                    file_date = datetime.fromtimestamp(os.path.getmtime(file_path))
+                    file_date = datetime.fromtimestamp(record.stat.st_mtime)
                     folder_name = file_date.strftime("%Y-%m")
 
                 self.organize_plan[folder_name].append(file_path)
@@ -799,6 +1302,14 @@ class FileToolsApp:
         self.resizer_folder_path = ""
         self.resizer_output_folder = ""
         self.resizer_images = []
+        self.resize_queue = None  # messages from the resize worker thread, while one runs
+        self.resize_cancel = None
+        self.resize_processed = 0
+        self.resize_failures = []
+        self.resizer_load_queue = None  # messages from the image listing thread, while one runs
+        self.resizer_load_cancel = None
+        self.resizer_skipped = 0
+        self.image_probe = ImageProbe()  # image sizes, cached between loads
         self.create_resizer_widgets()
 
     def create_resizer_widgets(self):
@@ -843,6 +1354,8 @@ class FileToolsApp:
                        value="fixed", command=self.update_resize_ui).pack(side=tk.LEFT, padx=10)
         ttk.Radiobutton(mode_frame, text="Max Dimensions (fit)", variable=self.resize_mode_var,
                        value="max", command=self.update_resize_ui).pack(side=tk.LEFT, padx=10)
+        ttk.Radiobutton(mode_frame, text="Renditions", variable=self.resize_mode_var,
+                       value="renditions", command=self.update_resize_ui).pack(side=tk.LEFT, padx=10)
 
         # Percentage input
         self.percentage_frame = ttk.Frame(options_frame)
@@ -874,6 +1387,14 @@ class FileToolsApp:
         ttk.Label(self.max_frame, text="(maintains aspect ratio)").pack(side=tk.LEFT, padx=5)
         self.max_frame.pack_forget()
 
+        # Renditions: several outputs per image from one decode
+        self.renditions_frame = ttk.Frame(options_frame)
+        ttk.Label(self.renditions_frame, text="One per line: suffix, WIDTHxHEIGHT (fit) or N%, "
+                  "optional format (jpeg/png/same) and quality").pack(anchor=tk.W)
+        self.renditions_text = tk.Text(self.renditions_frame, height=4, width=50)
+        self.renditions_text.insert("1.0", "_large 1920x1080\n_medium 800x800\n_thumb 200x200 jpeg 75")
+        self.renditions_text.pack(fill=tk.X, pady=(2, 0))
+
         # Quality setting
         quality_frame = ttk.Frame(options_frame)
         quality_frame.pack(fill=tk.X, pady=5)
@@ -894,6 +1415,22 @@ class FileToolsApp:
         ttk.Radiobutton(format_frame, text="JPEG", variable=self.format_var, value="JPEG").pack(side=tk.LEFT, padx=5)
         ttk.Radiobutton(format_frame, text="PNG", variable=self.format_var, value="PNG").pack(side=tk.LEFT, padx=5)
 
+        # Resampling speed: large downscales can shrink cheaply before the final LANCZOS step
+        speed_frame = ttk.Frame(options_frame)
+        speed_frame.pack(fill=tk.X, pady=5)
+        ttk.Label(speed_frame, text="Resampling:").pack(side=tk.LEFT)
+        self.resize_speed_var = tk.StringVar(value=DEFAULT_RESIZE_SPEED)
+        ttk.Radiobutton(speed_frame, text="Best Quality", variable=self.resize_speed_var, value="quality").pack(side=tk.LEFT, padx=10)
+        ttk.Radiobutton(speed_frame, text="Balanced", variable=self.resize_speed_var, value="balanced").pack(side=tk.LEFT, padx=5)
+        ttk.Radiobutton(speed_frame, text="Fastest", variable=self.resize_speed_var, value="fast").pack(side=tk.LEFT, padx=5)
+
+        # Images are resized in parallel worker processes
+        workers_frame = ttk.Frame(options_frame)
+        workers_frame.pack(fill=tk.X, pady=5)
+        ttk.Label(workers_frame, text="Workers:").pack(side=tk.LEFT)
+        self.resize_workers_var = tk.IntVar(value=DEFAULT_RESIZE_WORKERS)
+        ttk.Spinbox(workers_frame, from_=1, to=64, textvariable=self.resize_workers_var, width=5).pack(side=tk.LEFT, padx=5)
+
         # Status label
         self.resize_status_label = ttk.Label(self.resizer_tab, text="", foreground="gray")
         self.resize_status_label.pack(pady=5)
@@ -930,47 +1467,83 @@ class FileToolsApp:
             self.resizer_output_label.config(text=folder, foreground="black")
 
     def load_resizer_images(self):
+        """List the folder's images in the background; rows appear as their sizes are read"""
+        if self.resizer_load_cancel is not None:
+            self.resizer_load_cancel.set()
         self.resizer_images = []
+        self.resizer_skipped = 0
         self.resizer_tree.delete(*self.resizer_tree.get_children())
+        self.resize_btn.config(state="disabled")
+        self.resize_status_label.config(text="Reading images...")
+
+        self.resizer_load_cancel = threading.Event()
+        self.resizer_load_queue = queue.Queue()
+        threading.Thread(
+            target=self.resizer_load_worker,
+            args=(self.resizer_folder_path, self.resizer_load_cancel, self.resizer_load_queue),
+            daemon=True,
+        ).start()
+        self.root.after(SCAN_POLL_MS, self.poll_resizer_load, self.resizer_load_queue)
+
+    def resizer_load_worker(self, folder_path, cancel_event, results):
+        """List and probe images from a background thread, posting each one"""
+        try:
+            records = list_files(folder_path, extensions=RESIZER_EXTENSIONS)
+            for record, dimensions in self.image_probe.probe_all(records, cancel_event=cancel_event):
+                if isinstance(dimensions, Exception):
+                    results.put(("skipped", record.name, str(dimensions)))
+                    continue
+                results.put(("image", {
+                    'name': record.name,
+                    'path': record.path,
+                    'size': record.stat.st_size,
+                    'width': dimensions[0],
+                    'height': dimensions[1],
+                }))
+            results.put(("done", None))
+        except Exception as e:
+            results.put(("error", str(e)))
 
-        image_extensions = {'.jpg', '.jpeg', '.png', '.gif', '.bmp', '.webp', '.tiff'}
+    def poll_resizer_load(self, results):
+        """Add the probed images to the tree and enable resizing once all are in"""
+        if results is not self.resizer_load_queue:
+            return  # a newer load or a clear replaced this one
 
+        finished = False
         try:
-            for filename in os.listdir(self.resizer_folder_path):
-                file_path = os.path.join(self.resizer_folder_path, filename)
-                ext = os.path.splitext(filename)[1].lower()
-
-                if os.path.isfile(file_path) and ext in image_extensions:
-                    try:
-                        # Get file size
-                        size = os.path.getsize(file_path)
-                        size_str = self.format_size(size)
-
-                        # Get image dimensions
-                        with Image.open(file_path) as img:
-                            dimensions = f"{img.width}×{img.height}"
-
-                        self.resizer_images.append({
-                            'name': filename,
-                            'path': file_path,
-                            'size': size,
-                            'width': img.width,
-                            'height': img.height
-                        })
-
-                        self.resizer_tree.insert("", tk.END, values=(filename, size_str, dimensions))
-                    except:
-                        pass
-
-            if self.resizer_images:
-                self.resize_status_label.config(text=f"Found {len(self.resizer_images)} images")
-                self.resize_btn.config(state="normal")
-            else:
-                self.resize_status_label.config(text="No images found in folder")
-                self.resize_btn.config(state="disabled")
+            while True:
+                message = results.get_nowait()
+                kind = message[0]
+
+                if kind == "image":
+                    image_info = message[1]
+                    self.resizer_images.append(image_info)
+                    self.resizer_tree.insert("", tk.END, values=(
+                        image_info['name'], self.format_size(image_info['size']),
+                        f"{image_info['width']}×{image_info['height']}"))
+                elif kind == "skipped":
+                    self.resizer_skipped += 1
+                elif kind == "done":
+                    finished = True
+                elif kind == "error":
+                    messagebox.showerror("Error", f"Error loading images: {message[1]}")
+                    finished = True
+        except queue.Empty:
+            pass
 
-        except Exception as e:
-            messagebox.showerror("Error", f"Error loading images: {str(e)}")
+        skipped = f" ({self.resizer_skipped} unreadable)" if self.resizer_skipped else ""
+        if not finished:
+            self.resize_status_label.config(text=f"Reading images... {len(self.resizer_images)} found{skipped}")
+            self.root.after(SCAN_POLL_MS, self.poll_resizer_load, results)
+            return
+
+        self.resizer_load_queue = None
+        self.resizer_load_cancel = None
+        if self.resizer_images:
+            self.resize_status_label.config(text=f"Found {len(self.resizer_images)} images{skipped}")
+            self.resize_btn.config(state="normal")
+        else:
+            self.resize_status_label.config(text=f"No images found in folder{skipped}")
 
     def update_resize_ui(self):
         mode = self.resize_mode_var.get()
@@ -978,99 +1551,168 @@ class FileToolsApp:
             self.percentage_frame.pack(fill=tk.X, pady=5)
             self.fixed_frame.pack_forget()
             self.max_frame.pack_forget()
+            self.renditions_frame.pack_forget()
         elif mode == "fixed":
             self.fixed_frame.pack(fill=tk.X, pady=5)
             self.percentage_frame.pack_forget()
             self.max_frame.pack_forget()
+            self.renditions_frame.pack_forget()
+        elif mode == "renditions":
+            self.renditions_frame.pack(fill=tk.X, pady=5)
+            self.percentage_frame.pack_forget()
+            self.fixed_frame.pack_forget()
+            self.max_frame.pack_forget()
         else:  # max
             self.max_frame.pack(fill=tk.X, pady=5)
             self.percentage_frame.pack_forget()
             self.fixed_frame.pack_forget()
+            self.renditions_frame.pack_forget()
 
     def apply_resize(self):
-        if not self.resizer_images:
+        if not self.resizer_images or self.resize_queue is not None or self.resizer_load_queue is not None:
             return
 
         # Determine output folder
         output_folder = self.resizer_output_folder if self.resizer_output_folder else self.resizer_folder_path
 
-        # Confirm if overwriting
-        if output_folder == self.resizer_folder_path:
-            response = messagebox.askyesno(
-                "Confirm Overwrite",
-                f"This will overwrite {len(self.resizer_images)} images in the original folder.\nContinue?"
+        # Read all Tk variables here; the worker thread must not touch Tk
+        mode = self.resize_mode_var.get()
+        try:
+            options = {
+                'mode': mode,
+                'quality': int(float(self.quality_var.get())),
+                'format': self.format_var.get(),
+                'speed': self.resize_speed_var.get(),
+            }
+            if mode == "percentage":
+                options['scale'] = float(self.percentage_var.get()) / 100.0
+            elif mode == "fixed":
+                options['width'], options['height'] = int(self.width_var.get()), int(self.height_var.get())
+            elif mode == "renditions":
+                options['renditions'] = parse_renditions(self.renditions_text.get("1.0", tk.END),
+                                                         options['format'], options['quality'])
+            else:  # max dimensions
+                options['max_width'], options['max_height'] = int(self.max_width_var.get()), int(self.max_height_var.get())
+            workers = self.resize_workers_var.get()
+            if workers < 1:
+                raise ValueError("Workers must be at least 1")
+        except (ValueError, tk.TclError) as e:
+            messagebox.showerror("Error", f"Invalid resize options: {str(e)}")
+            return
+
+        # Renditions left in the folder by an earlier run are replaced, not resized again
+        images, earlier_renditions = split_rendition_outputs(self.resizer_images, output_folder, options)
+        if not images:
+            messagebox.showinfo("Nothing to Resize", "All images in the folder are renditions of other images.")
+            return
+
+        # Outputs written by two images would silently lose one of them
+        collisions, existing = check_outputs(images, output_folder, options)
+        if collisions:
+            listed = "\n".join(os.path.basename(path) for path in collisions[:10])
+            messagebox.showerror(
+                "Output Name Conflict",
+                f"{len(collisions)} output files would be written from more than one image "
+                f"or over another image being resized:\n\n{listed}"
             )
-            if not response:
-                return
+            return
 
-        try:
-            mode = self.resize_mode_var.get()
-            quality = int(float(self.quality_var.get()))
-            output_format = self.format_var.get()
-            processed = 0
-
-            for img_info in self.resizer_images:
-                input_path = img_info['path']
-                filename = img_info['name']
-
-                # Open image
-                with Image.open(input_path) as img:
-                    # Calculate new size
-                    if mode == "percentage":
-                        scale = float(self.percentage_var.get()) / 100.0
-                        new_width = int(img.width * scale)
-                        new_height = int(img.height * scale)
-                    elif mode == "fixed":
-                        new_width = int(self.width_var.get())
-                        new_height = int(self.height_var.get())
-                    else:  # max dimensions
-                        max_width = int(self.max_width_var.get())
-                        max_height = int(self.max_height_var.get())
-                        img.thumbnail((max_width, max_height), Image.Resampling.LANCZOS)
-                        new_width, new_height = img.size
-
-                    # Resize if needed
-                    if mode != "max":
-                        img = img.resize((new_width, new_height), Image.Resampling.LANCZOS)
-
-                    # Determine output format
-                    if output_format == "same":
-                        save_format = img.format or "JPEG"
-                        output_filename = filename
-                    else:
-                        save_format = output_format
-                        name_without_ext = os.path.splitext(filename)[0]
-                        ext = ".jpg" if output_format == "JPEG" else ".png"
-                        output_filename = f"{name_without_ext}{ext}"
+        # Confirm if overwriting the originals or other existing files
+        warnings = []
+        if output_folder == self.resizer_folder_path and mode != "renditions":
+            warnings.append(f"This will overwrite {len(images)} images in the original folder.")
+        if earlier_renditions:
+            warnings.append(f"{len(earlier_renditions)} images are renditions from an earlier run; "
+                            "they are skipped as sources and written again.")
+        if existing:
+            listed = "\n".join(os.path.basename(path) for path in existing[:10])
+            warnings.append(f"{len(existing)} existing files in the output folder will be overwritten:\n{listed}")
+        if warnings and not messagebox.askyesno("Confirm Overwrite", "\n\n".join(warnings) + "\n\nContinue?"):
+            return
 
-                    # Save
-                    output_path = os.path.join(output_folder, output_filename)
+        self.resize_btn.config(state="disabled")
+        self.resize_status_label.config(text=f"Resizing {len(images)} images...")
+        self.resize_cancel = threading.Event()
+        self.resize_queue = queue.Queue()
+        threading.Thread(
+            target=self.resize_worker,
+            args=(images, output_folder, options, workers, self.resize_cancel, self.resize_queue),
+            daemon=True
+        ).start()
+        self.root.after(SCAN_POLL_MS, self.poll_resize, self.resize_queue, output_folder, mode, len(images))
+
+    def resize_worker(self, images, output_folder, options, workers, cancel_event, results):
+        """Feed the resize process pool from a background thread, posting each result"""
+        try:
+            for result in resize_images(images, output_folder, options, workers=workers, cancel_event=cancel_event):
+                results.put(("result", result))
+            results.put(("done", None))
+        except Exception as e:
+            results.put(("error", str(e)))
 
-                    # Convert RGBA to RGB for JPEG
-                    if save_format == "JPEG" and img.mode in ("RGBA", "LA", "P"):
-                        rgb_img = Image.new("RGB", img.size, (255, 255, 255))
-                        if img.mode == "P":
-                            img = img.convert("RGBA")
-                        rgb_img.paste(img, mask=img.split()[-1] if img.mode in ("RGBA", "LA") else None)
-                        img = rgb_img
+    def poll_resize(self, results, output_folder, mode, total):
+        """Log results from the resize worker and report when all are in"""
+        if results is not self.resize_queue:
+            return  # the resizer was cleared, drop its remaining messages
 
-                    img.save(output_path, format=save_format, quality=quality, optimize=True)
-                    processed += 1
+        finished = False
+        try:
+            while True:
+                message = results.get_nowait()
+                kind = message[0]
+
+                if kind == "result":
+                    result = message[1]
+                    name = os.path.basename(result['path'] or "")
+                    if 'error' in result:
+                        self.resize_failures.append(f"{name}: {result['error']}")
+                        self.add_log("resize", f"Failed to resize '{name}': {result['error']}")
+                    elif 'renditions' in result:
+                        self.resize_processed += 1
+                        sizes = ", ".join(f"{width}×{height}" for _, width, height in result['renditions'])
+                        self.add_log("resize", f"Resized '{name}' → {len(result['renditions'])} renditions ({sizes})")
+                    else:
+                        self.resize_processed += 1
+                        self.add_log("resize", f"Resized '{name}' → {result['width']}×{result['height']} ({mode} mode)")
+                    self.resize_status_label.config(
+                        text=f"Resized {self.resize_processed + len(self.resize_failures)} of {total} images")
+                elif kind == "done":
+                    finished = True
+                elif kind == "error":
+                    messagebox.showerror("Error", f"Error resizing images: {message[1]}")
+                    finished = True
+        except queue.Empty:
+            pass
 
-                    # Log the resize
-                    self.add_log("resize", f"Resized '{filename}' → {new_width}×{new_height} ({mode} mode)")
+        if not finished:
+            self.root.after(SCAN_POLL_MS, self.poll_resize, results, output_folder, mode, total)
+            return
 
-            messagebox.showinfo("Success", f"Resized {processed} images successfully!")
+        processed, failures = self.resize_processed, self.resize_failures
+        self.resize_queue = None
+        self.resize_processed, self.resize_failures = 0, []
+        self.resize_btn.config(state="normal")
+        if failures:
+            self.resize_status_label.config(text=f"Resized {processed} images, {len(failures)} failed")
+            listed = "\n".join(failures[:10])
+            messagebox.showwarning("Resize Finished",
+                                   f"Resized {processed} images; {len(failures)} failed:\n\n{listed}")
+        else:
             self.resize_status_label.config(text=f"Successfully resized {processed} images")
+            messagebox.showinfo("Success", f"Resized {processed} images successfully!")
 
-            # Reload if output is same folder
-            if output_folder == self.resizer_folder_path:
-                self.load_resizer_images()
-
-        except Exception as e:
-            messagebox.showerror("Error", f"Error resizing images: {str(e)}")
+        # Reload if output is same folder
+        if output_folder == self.resizer_folder_path:
+            self.load_resizer_images()
 
     def clear_resizer(self):
+        if self.resize_cancel is not None:
+            self.resize_cancel.set()
+        if self.resizer_load_cancel is not None:
+            self.resizer_load_cancel.set()
+        self.resize_queue = None
+        self.resizer_load_queue = None
+        self.resize_processed, self.resize_failures = 0, []
         self.resizer_folder_path = ""
         self.resizer_output_folder = ""
         self.resizer_folder_label.config(text="No folder selected", foreground="gray")
@@ -1140,6 +1782,8 @@ class FileToolsApp:
                        value="organize", command=self.refresh_log_display).pack(side=tk.LEFT, padx=5)
         ttk.Radiobutton(filter_frame, text="Resize", variable=self.log_filter_var,
                        value="resize", command=self.refresh_log_display).pack(side=tk.LEFT, padx=5)
+        ttk.Radiobutton(filter_frame, text="Hardlinks", variable=self.log_filter_var,
+                       value="link", command=self.refresh_log_display).pack(side=tk.LEFT, padx=5)
 
         # Log display area
         log_frame = ttk.LabelFrame(self.log_tab, text="Recent Operations", padding="10")
@@ -1157,6 +1801,7 @@ class FileToolsApp:
         self.log_text.tag_configure("delete", foreground="#cc0000")
         self.log_text.tag_configure("organize", foreground="#009900")
         self.log_text.tag_configure("resize", foreground="#9900cc")
+        self.log_text.tag_configure("link", foreground="#cc6600")
         self.log_text.tag_configure("timestamp", foreground="#666666")
 
         # Initial display
@@ -1178,6 +1823,7 @@ class FileToolsApp:
             self.log_text.insert(tk.END, "  • Delete duplicates\n")
             self.log_text.insert(tk.END, "  • Organize files\n")
             self.log_text.insert(tk.END, "  • Resize images\n")
+            self.log_text.insert(tk.END, "  • Replace duplicates with hardlinks\n")
             return
 
         # Display logs in reverse order (newest first)
@@ -1201,6 +1847,9 @@ class FileToolsApp:
             elif op_type == "resize":
                 self.log_text.insert(tk.END, "RESIZE: ", "resize")
                 self.log_text.insert(tk.END, f"{details}\n")
+            elif op_type == "link":
+                self.log_text.insert(tk.END, "HARDLINK: ", "link")
+                self.log_text.insert(tk.END, f"{details}\n")
 
             self.log_text.insert(tk.END, "\n")
 
@@ -1219,6 +1868,8 @@ class FileToolsApp:
             messagebox.showinfo("Logs Cleared", "All operation logs have been cleared.")
 
 if __name__ == "__main__":
+    # Needed for the optional process pools in a frozen (PyInstaller) build
+    multiprocessing.freeze_support()
     root = TkinterDnD.Tk()
     app = FileToolsApp(root)
     root.mainloop()
@@ -0,0 +1,63 @@
+"""Shared os.scandir-based directory walker.
+
+Every tool lists folders through walk_files(), which yields one record
+per file with its stat data already attached. Entry types come from the
+directory listing itself, so a file costs one stat and directories cost
+none. Hidden entries and excluded directories are pruned before
+descending. Symlinks are skipped: a file symlink would carry its
+target's device and inode and pass for a hardlink of it.
+"""
+import os
+from collections import namedtuple
+
+FileRecord = namedtuple('FileRecord', ['name', 'path', 'stat'])
+
+# Directory names that are usually not worth descending into
+DEFAULT_EXCLUDED_DIRS = frozenset({'node_modules', '__pycache__', '$RECYCLE.BIN', 'System Volume Information'})
+
+
+def walk_files(folder_path, recursive=False, include_hidden=False, exclude_dirs=(),
+               extensions=None, cancel_event=None):
+    """Yield a FileRecord for each file under folder_path.
+
+    extensions, if given, is a set of lowercase suffixes (e.g. {'.jpg'});
+    other files are skipped before they are stat'ed. Unreadable entries
+    and subdirectories are skipped; OSError from folder_path itself is
+    raised. Directory symlinks are not followed.
+    """
+    exclude_dirs = set(exclude_dirs)
+    pending = [folder_path]
+
+    while pending:
+        if cancel_event is not None and cancel_event.is_set():
+            return
+
+        current = pending.pop()
+        try:
+            with os.scandir(current) as entries:
+                for entry in entries:
+                    name = entry.name
+                    if not include_hidden and name.startswith('.'):
+                        continue
+
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            if recursive and name not in exclude_dirs:
+                                pending.append(entry.path)
+                            continue
+                        if not entry.is_file(follow_symlinks=False):
+                            continue
+                        if extensions is not None and os.path.splitext(name)[1].lower() not in extensions:
+                            continue
+                        yield FileRecord(name, entry.path, entry.stat(follow_symlinks=False))
+                    except OSError:
+                        continue
+        except OSError:
+            if current == folder_path:
+                raise  # the folder itself can't be listed: let the caller report it
+            continue
+
+
+def list_files(folder_path, **options):
+    """Return the files directly in folder_path as a list sorted by name"""
+    return sorted(walk_files(folder_path, **options), key=lambda record: record.name)
@@ -0,0 +1,57 @@
+"""One-scan stat snapshot of a folder for the renamers.
+
+The folder is listed once when it is loaded; sorting, date naming,
+preview and apply all work from the captured stat results instead of
+asking the filesystem again. Before renaming, is_current() compares the
+folder's own mtime with the one seen at capture time: any file being
+added, removed or renamed in the folder changes it, so a single stat
+tells whether the snapshot can still be trusted. That check is coarse on
+some filesystems and can be stale on network shares, so each rename
+still checks that its own target is free.
+"""
+import os
+
+from file_walker import FileRecord
+
+
+class FolderSnapshot:
+    def __init__(self, folder_path, records, inodes, dir_mtime_ns, subfolders=()):
+        self.folder_path = folder_path
+        self.records = records  # FileRecords of the listed files, in directory order
+        self.inodes = inodes  # {name: inode} of every entry, including hidden ones and folders
+        self.names = set(inodes)
+        self.dir_mtime_ns = dir_mtime_ns
+        self.subfolders = subfolders  # paths of the listed subfolders, for recursive loading
+        self.stats = {record.name: record.stat for record in records}
+
+    @classmethod
+    def capture(cls, folder_path, include_hidden=False):
+        """List the files and subfolders directly in folder_path and remember the folder's mtime"""
+        # Stat the folder first so changes made during the scan invalidate it
+        dir_mtime_ns = os.stat(folder_path).st_mtime_ns
+        records = []
+        subfolders = []
+        inodes = {}
+        with os.scandir(folder_path) as entries:
+            for entry in entries:
+                try:
+                    inodes[entry.name] = entry.inode()  # of the entry itself, like lstat
+                except OSError:
+                    inodes[entry.name] = None
+                if not include_hidden and entry.name.startswith('.'):
+                    continue
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        subfolders.append(entry.path)
+                    elif entry.is_file(follow_symlinks=False):  # symlinks are skipped, as in walk_files
+                        records.append(FileRecord(entry.name, entry.path, entry.stat(follow_symlinks=False)))
+                except OSError:
+                    continue
+        return cls(folder_path, records, inodes, dir_mtime_ns, subfolders)
+
+    def is_current(self):
+        """True if no entry in the folder was added, removed or renamed since capture"""
+        try:
+            return os.stat(self.folder_path).st_mtime_ns == self.dir_mtime_ns
+        except OSError:
+            return False
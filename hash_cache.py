@@ -0,0 +1,112 @@
+"""Persistent content-hash cache for the Duplicate Finder.
+
+Digests are stored in SQLite keyed by (device, inode, kind) and are only
+trusted while the file's size and mtime_ns are unchanged. Stats without
+an inode number are never cached, since they would all share one key. The cache is
+bounded to max_entries rows; the least recently used rows are evicted.
+"""
+import os
+import sqlite3
+import time
+
+DEFAULT_CACHE_FILE = os.path.join(os.path.expanduser("~"), ".file_tools_hash_cache.db")
+DEFAULT_MAX_ENTRIES = 2_000_000
+# Pending writes are flushed to disk in batches of this size
+FLUSH_EVERY = 5000
+
+
+class HashCache:
+    def __init__(self, db_path=DEFAULT_CACHE_FILE, max_entries=DEFAULT_MAX_ENTRIES):
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self.pending_puts = []
+        self.pending_touches = []
+
+        self.conn = sqlite3.connect(db_path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS hashes (
+                dev INTEGER NOT NULL,
+                ino INTEGER NOT NULL,
+                kind TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                digest TEXT NOT NULL,
+                last_used REAL NOT NULL,
+                PRIMARY KEY (dev, ino, kind)
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS hashes_last_used ON hashes (last_used)")
+        self.conn.commit()
+
+    def get(self, stat, kind):
+        """Return the cached digest for a file, or None if missing or stale"""
+        if not stat.st_ino:
+            return None  # no inode number (e.g. DirEntry.stat() on Windows): no usable key
+        row = self.conn.execute(
+            "SELECT size, mtime_ns, digest FROM hashes WHERE dev=? AND ino=? AND kind=?",
+            (stat.st_dev, stat.st_ino, kind)
+        ).fetchone()
+
+        if row is None or row[0] != stat.st_size or row[1] != stat.st_mtime_ns:
+            return None
+
+        self.pending_touches.append((time.time(), stat.st_dev, stat.st_ino, kind))
+        self._maybe_flush()
+        return row[2]
+
+    def put(self, stat, kind, digest):
+        """Store a digest for a file (written on the next flush); skipped without an inode number"""
+        if not stat.st_ino:
+            return
+        self.pending_puts.append((stat.st_dev, stat.st_ino, kind, stat.st_size,
+                                  stat.st_mtime_ns, digest, time.time()))
+        self._maybe_flush()
+
+    def _maybe_flush(self):
+        if len(self.pending_puts) + len(self.pending_touches) >= FLUSH_EVERY:
+            self.flush()
+
+    def flush(self):
+        """Write pending entries and last-used times in one transaction"""
+        if not self.pending_puts and not self.pending_touches:
+            return
+
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO hashes VALUES (?, ?, ?, ?, ?, ?, ?)",
+                self.pending_puts
+            )
+            self.conn.executemany(
+                "UPDATE hashes SET last_used=? WHERE dev=? AND ino=? AND kind=?",
+                self.pending_touches
+            )
+        self.pending_puts = []
+        self.pending_touches = []
+
+    def evict(self):
+        """Drop least recently used rows until the cache fits max_entries"""
+        count = self.conn.execute("SELECT COUNT(*) FROM hashes").fetchone()[0]
+        excess = count - self.max_entries
+        if excess > 0:
+            with self.conn:
+                self.conn.execute(
+                    "DELETE FROM hashes WHERE rowid IN "
+                    "(SELECT rowid FROM hashes ORDER BY last_used LIMIT ?)",
+                    (excess,)
+                )
+        return max(excess, 0)
+
+    def clear(self):
+        """Remove every cached digest"""
+        self.pending_puts = []
+        self.pending_touches = []
+        with self.conn:
+            self.conn.execute("DELETE FROM hashes")
+        self.conn.execute("VACUUM")
+
+    def close(self):
+        self.flush()
+        self.evict()
+        self.conn.close()
@@ -0,0 +1,87 @@
+"""Parallel hashing engine with bounded per-device I/O concurrency.
+
+Hash jobs are spread over a thread pool (or optionally a process pool),
+while the number of jobs in flight on any one device is capped so that
+spinning disks are not thrashed by many competing readers.
+"""
+import multiprocessing
+import os
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+DEFAULT_WORKERS = min(32, (os.cpu_count() or 1) * 4)
+DEFAULT_PER_DEVICE = 4
+# Seconds between checks of the cancel flag while waiting on workers
+CANCEL_POLL_INTERVAL = 0.1
+
+
+class HashEngine:
+    def __init__(self, workers=DEFAULT_WORKERS, use_processes=False, per_device_limit=DEFAULT_PER_DEVICE):
+        self.workers = max(1, workers)
+        self.use_processes = use_processes
+        self.per_device_limit = max(1, per_device_limit)
+        self.executor = None
+
+    def _get_executor(self):
+        if self.executor is None:
+            if self.use_processes:
+                # Forking the multi-threaded Tk app could copy held locks into the children
+                self.executor = ProcessPoolExecutor(max_workers=self.workers,
+                                                    mp_context=multiprocessing.get_context("spawn"))
+            else:
+                self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="hash")
+        return self.executor
+
+    def run(self, jobs, cancel_event=None):
+        """Run hash jobs and yield (key, result) as they complete.
+
+        Each job is a (key, device, func, args) tuple; func(*args) runs in
+        a worker. func must be a module-level function when processes are
+        used. Devices are served round-robin, each with at most
+        per_device_limit jobs in flight. Once cancel_event is set no new
+        jobs start, queued ones are dropped and the generator returns.
+        """
+        queues = defaultdict(deque)
+        for job in jobs:
+            queues[job[1]].append(job)
+        if not queues:
+            return
+
+        executor = self._get_executor()
+        in_flight = defaultdict(int)
+        pending = {}
+
+        def fill():
+            for device, queue in queues.items():
+                while queue and in_flight[device] < self.per_device_limit and len(pending) < self.workers * 2:
+                    key, _, func, args = queue.popleft()
+                    pending[executor.submit(func, *args)] = (key, device)
+                    in_flight[device] += 1
+
+        fill()
+        while pending:
+            if cancel_event is not None and cancel_event.is_set():
+                for future in pending:
+                    future.cancel()
+                return
+            done, _ = wait(pending, timeout=CANCEL_POLL_INTERVAL, return_when=FIRST_COMPLETED)
+            for future in done:
+                key, device = pending.pop(future)
+                in_flight[device] -= 1
+                try:
+                    result = future.result()
+                except Exception:
+                    result = None
+                yield key, result
+            fill()
+
+    def close(self, wait=True):
+        if self.executor is not None:
+            self.executor.shutdown(wait=wait, cancel_futures=True)
+            self.executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
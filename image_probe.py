@@ -0,0 +1,159 @@
+"""Image dimensions from file headers, without decoding.
+
+probe_dimensions() reads only the bytes that hold the size: the PNG IHDR
+chunk, the GIF logical screen, the BMP info header, the WebP VP8/VP8L/VP8X
+chunk, the first TIFF IFD, or the JPEG markers up to the SOF frame header
+(skipping APP segments such as EXIF with a seek rather than reading them).
+On a network share that is one or two small reads per file instead of
+Pillow's format detection.
+
+ImageProbe adds a cache keyed by path and checked against mtime and size,
+falls back to Pillow for files the parser doesn't understand, and probes
+many files at once on a thread pool, since the time goes into waiting on
+the disk or server.
+"""
+import struct
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image
+
+# Files probed at the same time
+DEFAULT_WORKERS = 16
+DEFAULT_MAX_ENTRIES = 200_000
+# Start-of-frame markers: SOF0-SOF15 except DHT (C4), JPG (C8) and DAC (CC)
+JPEG_SOF_MARKERS = frozenset(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+# Markers without a length field
+JPEG_STANDALONE_MARKERS = frozenset({0x01, *range(0xD0, 0xD9)})
+
+
+def _jpeg_size(f):
+    f.seek(2)
+    while True:
+        byte = f.read(1)
+        while byte and byte != b'\xff':
+            byte = f.read(1)  # skip garbage between segments
+        while byte == b'\xff':
+            byte = f.read(1)  # fill bytes
+        if not byte:
+            raise ValueError("JPEG has no frame header")
+        marker = byte[0]
+        if marker in JPEG_STANDALONE_MARKERS:
+            continue
+        if marker in (0xD9, 0xDA):
+            raise ValueError("JPEG image data before the frame header")
+        length, = struct.unpack('>H', f.read(2))
+        if marker in JPEG_SOF_MARKERS:
+            height, width = struct.unpack('>xHH', f.read(5))
+            if not height:
+                raise ValueError("JPEG height is defined later in the file")
+            return width, height
+        f.seek(length - 2, 1)
+
+
+def _tiff_size(f, header):
+    endian = '<' if header[:2] == b'II' else '>'
+    f.seek(struct.unpack(endian + 'I', header[4:8])[0])
+    count, = struct.unpack(endian + 'H', f.read(2))
+    entries = f.read(count * 12)
+    found = {}
+    for offset in range(0, len(entries) - 11, 12):
+        tag, field_type = struct.unpack(endian + 'HH', entries[offset:offset + 4])
+        if tag in (256, 257):
+            value_format = 'H' if field_type == 3 else 'I'
+            found[tag], = struct.unpack(endian + value_format, entries[offset + 8:offset + 8 + struct.calcsize(value_format)])
+    if 256 not in found or 257 not in found:
+        raise ValueError("TIFF has no image size tags")
+    return found[256], found[257]
+
+
+def _webp_size(header):
+    chunk = header[12:16]
+    if chunk == b'VP8 ':
+        width, height = struct.unpack('<HH', header[26:30])
+        return width & 0x3FFF, height & 0x3FFF
+    if chunk == b'VP8L':
+        bits, = struct.unpack('<I', header[21:25])
+        return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+    if chunk == b'VP8X':
+        return (int.from_bytes(header[24:27], 'little') + 1,
+                int.from_bytes(header[27:30], 'little') + 1)
+    raise ValueError("Unknown WebP chunk")
+
+
+def probe_dimensions(path):
+    """(width, height) of an image from its header.
+
+    Raises ValueError if the format isn't recognised or the header is
+    malformed, and OSError if the file can't be read.
+    """
+    with open(path, 'rb') as f:
+        header = f.read(32)
+        try:
+            if header[:3] == b'\xff\xd8\xff':
+                return _jpeg_size(f)
+            if header[:8] == b'\x89PNG\r\n\x1a\n' and header[12:16] == b'IHDR':
+                return struct.unpack('>II', header[16:24])
+            if header[:6] in (b'GIF87a', b'GIF89a'):
+                return struct.unpack('<HH', header[6:10])
+            if header[:4] == b'RIFF' and header[8:12] == b'WEBP':
+                return _webp_size(header)
+            if header[:2] == b'BM':
+                if struct.unpack('<I', header[14:18])[0] == 12:  # OS/2 core header
+                    return struct.unpack('<HH', header[18:22])
+                width, height = struct.unpack('<ii', header[18:26])
+                return width, abs(height)  # negative height: stored top-down
+            if header[:4] in (b'II*\x00', b'MM\x00*'):
+                return _tiff_size(f, header)
+        except struct.error:
+            raise ValueError("Truncated image header")
+    raise ValueError("Unrecognised image format")
+
+
+class ImageProbe:
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.cache = {}  # path -> (mtime_ns, size, (width, height)), oldest first
+        self.lock = threading.Lock()
+
+    def dimensions(self, path, stat):
+        """(width, height) of the image at path, whose os.stat result is stat"""
+        with self.lock:
+            cached = self.cache.get(path)
+        if cached is not None and cached[:2] == (stat.st_mtime_ns, stat.st_size):
+            return cached[2]
+
+        try:
+            size = probe_dimensions(path)
+        except ValueError:
+            # Unusual layouts (e.g. a JPEG whose height comes after the scan): let Pillow read it
+            with Image.open(path) as img:
+                size = img.size
+
+        with self.lock:
+            self.cache.pop(path, None)
+            self.cache[path] = (stat.st_mtime_ns, stat.st_size, size)
+            if len(self.cache) > self.max_entries:
+                del self.cache[next(iter(self.cache))]
+        return size
+
+    def _try_dimensions(self, record):
+        try:
+            return record, self.dimensions(record.path, record.stat)
+        except Exception as e:
+            return record, e
+
+    def probe_all(self, records, workers=DEFAULT_WORKERS, cancel_event=None):
+        """Yield (record, (width, height) or the exception) for FileRecords, in order.
+
+        Files are probed workers at a time; once cancel_event is set the
+        generator stops and the files not yet started are dropped.
+        """
+        pool = ThreadPoolExecutor(max_workers=workers)
+        try:
+            for result in pool.map(self._try_dimensions, records):
+                if cancel_event is not None and cancel_event.is_set():
+                    return
+                yield result
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
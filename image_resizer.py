@@ -0,0 +1,386 @@
+"""Batch image resizing on a process pool.
+
+Decoding, LANCZOS resampling and encoding are CPU-bound, so each image is
+handled start to finish by a worker process: only the input path and the
+options go to the worker, which reads, resizes and writes the output
+itself and sends back a small result dict. Outputs are written to a
+temporary name and moved into place, so an interrupted overwrite never
+leaves a truncated image behind.
+
+Memory is bounded on the submitting side: every image's decoded size is
+estimated from its dimensions (known from the listing), and new images
+are only handed out while the estimates of those in flight fit in the
+memory budget. One image is always allowed, however large.
+
+Large downscales take a fast path unless the "quality" speed is chosen:
+JPEGs are decoded in draft mode, where libjpeg scales by 1/2, 1/4 or 1/8
+inside the DCT, and other formats are first shrunk by an integer factor
+with Image.reduce(); only the last step is LANCZOS resampled. The speed
+sets how much larger than the output the image stays before that step.
+In renditions mode one source becomes several outputs (say large, medium
+and thumbnail), each with its own size, format, quality and file name
+suffix. The source is decoded once, at the scale the largest rendition
+needs, and each smaller rendition is resampled from the smallest one
+already made that is still big enough, so the cost is close to a single
+resize rather than one per rendition.
+
+Run this module on a folder of images to compare the speeds:
+
+    python3 image_resizer.py FOLDER [MAX_WIDTH MAX_HEIGHT]
+"""
+import math
+import multiprocessing
+import os
+import re
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+from PIL import Image, ImageChops, ImageStat
+
+DEFAULT_WORKERS = os.cpu_count() or 1
+DEFAULT_MEMORY_BUDGET = 2 * 1024 ** 3
+# Bytes per pixel held while resizing: the decoded source plus the output, RGBA
+BYTES_PER_PIXEL = 8
+# Seconds between checks of the cancel flag while waiting on workers
+CANCEL_POLL_INTERVAL = 0.1
+# Speed -> minimum ratio of the image to the output size before the final
+# LANCZOS step; None decodes and resamples at full size
+SPEEDS = {
+    "quality": None,
+    "balanced": 2.0,
+    "fast": 1.0,
+}
+DEFAULT_SPEED = "balanced"
+OUTPUT_FORMATS = {'same': "same", 'jpeg': "JPEG", 'jpg': "JPEG", 'png': "PNG"}
+# One rendition per line: SUFFIX SIZE [FORMAT] [QUALITY], SIZE being WIDTHxHEIGHT (fit) or N%
+RENDITION_PATTERN = re.compile(r"(\S+)\s+(?:(\d+)\s*[x×]\s*(\d+)|(\d+(?:\.\d+)?)%)(?:\s+([A-Za-z]+))?(?:\s+(\d+))?")
+BENCHMARK_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.webp', '.tiff', '.bmp'}
+
+
+def target_size(width, height, options):
+    """Output (width, height) for a width x height image.
+
+    options holds 'mode' ("percentage", "fixed" or "max") and 'scale',
+    'width'/'height' or 'max_width'/'max_height' to match.
+    """
+    mode = options['mode']
+    if mode == "percentage":
+        return max(1, int(width * options['scale'])), max(1, int(height * options['scale']))
+    if mode == "fixed":
+        return options['width'], options['height']
+    # Fit within the maximum, keeping the aspect ratio and never enlarging
+    ratio = min(options['max_width'] / width, options['max_height'] / height, 1)
+    return max(1, round(width * ratio)), max(1, round(height * ratio))
+
+
+def output_name(filename, output_format, suffix=""):
+    """File name of the output; "same" keeps the extension, otherwise it follows the format"""
+    base, ext = os.path.splitext(filename)
+    if output_format != "same":
+        ext = ".jpg" if output_format == "JPEG" else ".png"
+    return f"{base}{suffix}{ext}"
+
+
+def output_paths(input_path, output_folder, options):
+    """Paths resize_image() writes for input_path: one per rendition, or one"""
+    filename = os.path.basename(input_path)
+    if options.get('renditions'):
+        return [os.path.join(output_folder, output_name(filename, rendition['format'], rendition['suffix']))
+                for rendition in options['renditions']]
+    return [os.path.join(output_folder, output_name(filename, options['format']))]
+
+
+def check_outputs(images, output_folder, options):
+    """Find outputs of a run that would clobber each other or existing files.
+
+    Returns (collisions, existing): output paths written for more than
+    one image or onto another image of the run (say a.png and a.jpg both
+    becoming a.jpg), and files already in output_folder that would be
+    replaced. An image overwriting itself is in neither.
+    """
+    try:
+        existing_names = set(os.listdir(output_folder))
+    except OSError:
+        existing_names = set()
+    sources = {os.path.normcase(image_info['path']) for image_info in images}
+    writers = {}
+    for image_info in images:
+        for path in output_paths(image_info['path'], output_folder, options):
+            writers.setdefault(os.path.normcase(path), []).append((path, os.path.normcase(image_info['path'])))
+
+    collisions = []
+    existing = []
+    for key, written in writers.items():
+        path, source = written[0]
+        if len(written) > 1 or (key in sources and key != source):
+            collisions.append(path)
+        elif key != source and os.path.basename(path) in existing_names:
+            existing.append(path)
+    return sorted(collisions), sorted(existing)
+
+
+def split_rendition_outputs(images, output_folder, options):
+    """Split images into (sources, outputs) for a renditions run.
+
+    outputs are images that another image of the run writes, such as the
+    "x_thumb.jpg" of an earlier run into the source folder; as sources
+    they would collide with the renditions they are about to be replaced
+    by. Outside renditions mode every image is a source.
+    """
+    if not options.get('renditions'):
+        return list(images), []
+    written = {os.path.normcase(path) for image_info in images
+               for path in output_paths(image_info['path'], output_folder, options)}
+    sources, outputs = [], []
+    for image_info in images:
+        (outputs if os.path.normcase(image_info['path']) in written else sources).append(image_info)
+    return sources, outputs
+
+
+def parse_renditions(text, default_format="same", default_quality=85):
+    """Renditions from text with one "SUFFIX SIZE [FORMAT] [QUALITY]" per line.
+
+    SIZE is WIDTHxHEIGHT to fit within (never enlarging) or a percentage,
+    e.g. "_large 1920x1080 jpeg 85" or "_thumb 10% png". Returns a list
+    of dicts with 'suffix', 'format', 'quality' and target_size() keys.
+    Raises ValueError for a malformed line or a repeated suffix.
+    """
+    renditions = []
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        match = RENDITION_PATTERN.fullmatch(line)
+        if not match:
+            raise ValueError(f"Invalid rendition '{line}': expected SUFFIX WIDTHxHEIGHT|N% [FORMAT] [QUALITY]")
+        suffix, width, height, percent, output_format, quality = match.groups()
+        rendition = {'suffix': suffix, 'format': default_format, 'quality': default_quality}
+        if percent is not None:
+            rendition.update(mode="percentage", scale=float(percent) / 100)
+        else:
+            rendition.update(mode="max", max_width=int(width), max_height=int(height))
+        if output_format is not None:
+            if output_format.lower() not in OUTPUT_FORMATS:
+                raise ValueError(f"Unknown format '{output_format}' in rendition '{line}'")
+            rendition['format'] = OUTPUT_FORMATS[output_format.lower()]
+        if quality is not None:
+            rendition['quality'] = int(quality)
+        if not 1 <= rendition['quality'] <= 100:
+            raise ValueError(f"Quality must be between 1 and 100 in rendition '{line}'")
+        if not all(rendition.get(key, 1) > 0 for key in ('scale', 'max_width', 'max_height')):
+            raise ValueError(f"Size must be positive in rendition '{line}'")
+        if "/" in suffix or os.sep in suffix or (os.altsep and os.altsep in suffix):
+            raise ValueError(f"Rendition suffix '{suffix}' contains a path separator")
+        if any(other['suffix'] == suffix for other in renditions):
+            raise ValueError(f"Rendition suffix '{suffix}' is used twice")
+        renditions.append(rendition)
+    if not renditions:
+        raise ValueError("No renditions given")
+    return renditions
+
+
+def scaled(img, new_size, speed=DEFAULT_SPEED):
+    """img resized to new_size; call before img is loaded so JPEG draft mode can apply"""
+    if new_size == img.size:
+        return img
+    gap = SPEEDS[speed]
+    if gap is not None:
+        # JPEG only: decode at the smallest DCT scale that keeps gap x the output size
+        img.draft(None, (math.ceil(new_size[0] * gap), math.ceil(new_size[1] * gap)))
+    return img.resize(new_size, Image.Resampling.LANCZOS, reducing_gap=gap)
+
+
+def flatten_for_jpeg(img):
+    """JPEG has no alpha: composite transparent images onto white"""
+    if img.mode not in ("RGBA", "LA", "P"):
+        return img
+    if img.mode == "P":
+        img = img.convert("RGBA")
+    rgb_img = Image.new("RGB", img.size, (255, 255, 255))
+    rgb_img.paste(img, mask=img.split()[-1])
+    return rgb_img
+
+
+def save_image(img, source_format, output_folder, filename, options, suffix=""):
+    """Write img per options' 'format' and 'quality' via a temporary file; returns the output path"""
+    output_format = options['format']
+    save_format = (source_format or "JPEG") if output_format == "same" else output_format
+    if save_format == "JPEG":
+        img = flatten_for_jpeg(img)
+
+    output_path = os.path.join(output_folder, output_name(filename, output_format, suffix))
+    temp_path = os.path.join(output_folder, f".{filename}{suffix}.resizing-{os.getpid()}")
+    try:
+        img.save(temp_path, format=save_format, quality=options['quality'], optimize=True)
+        os.replace(temp_path, output_path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    return output_path
+
+
+def resize_image(input_path, output_folder, options):
+    """Resize one image and write it to output_folder; runs in a worker process.
+
+    Returns {'path', 'output', 'width', 'height'} or {'path', 'error'};
+    with options['renditions'] see resize_renditions().
+    """
+    if options.get('renditions'):
+        return resize_renditions(input_path, output_folder, options)
+    filename = os.path.basename(input_path)
+    try:
+        with Image.open(input_path) as img:
+            source_format = img.format
+            new_size = target_size(img.width, img.height, options)
+            img = scaled(img, new_size, options.get('speed', DEFAULT_SPEED))
+            output_path = save_image(img, source_format, output_folder, filename, options)
+    except Exception as e:
+        return {'path': input_path, 'error': str(e)}
+    return {'path': input_path, 'output': output_path, 'width': new_size[0], 'height': new_size[1]}
+
+
+def resize_renditions(input_path, output_folder, options):
+    """Write every rendition in options['renditions'] from one decode of the image.
+
+    Renditions are made largest first. Each is resampled from the
+    smallest image made so far that is at least the speed's gap times its
+    size, or from the full decode with the "quality" speed. Returns
+    {'path', 'renditions': [(output, width, height)]} or {'path', 'error'}.
+    """
+    filename = os.path.basename(input_path)
+    gap = SPEEDS[options.get('speed', DEFAULT_SPEED)]
+    try:
+        with Image.open(input_path) as img:
+            source_format = img.format
+            targets = sorted(((target_size(img.width, img.height, rendition), rendition)
+                              for rendition in options['renditions']),
+                             key=lambda target: target[0][0] * target[0][1], reverse=True)
+            if gap is not None:
+                # JPEG only: decode once at the scale the largest rendition needs
+                needed = (max(width for (width, _), _ in targets), max(height for (_, height), _ in targets))
+                img.draft(None, (math.ceil(needed[0] * gap), math.ceil(needed[1] * gap)))
+            img.load()
+
+            made = [img]  # largest first
+            outputs = []
+            for new_size, rendition in targets:
+                source = img
+                if gap is not None:
+                    source = next(candidate for candidate in reversed(made)
+                                  if candidate is img or (candidate.width >= new_size[0] * gap and
+                                                          candidate.height >= new_size[1] * gap))
+                resized = source
+                if new_size != source.size:
+                    resized = source.resize(new_size, Image.Resampling.LANCZOS, reducing_gap=gap)
+                made.append(resized)
+                output_path = save_image(resized, source_format, output_folder, filename, rendition,
+                                         rendition['suffix'])
+                outputs.append((output_path, new_size[0], new_size[1]))
+    except Exception as e:
+        return {'path': input_path, 'error': str(e)}
+    return {'path': input_path, 'renditions': outputs}
+
+
+def estimated_memory(image_info):
+    """Bytes a worker needs to resize an image of image_info's dimensions"""
+    return image_info['width'] * image_info['height'] * BYTES_PER_PIXEL
+
+
+def resize_images(images, output_folder, options, workers=DEFAULT_WORKERS,
+                  memory_budget=DEFAULT_MEMORY_BUDGET, cancel_event=None):
+    """Resize images (dicts with 'path', 'width' and 'height') and yield each result as it completes.
+
+    Once cancel_event is set no new images start, and the generator
+    returns after cancelling the queued ones.
+    """
+    queue = deque(images)
+    if not queue:
+        return
+    workers = max(1, workers)
+
+    pending = {}
+    in_memory = 0
+    # Forking the multi-threaded Tk app could copy held locks into the children
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+        def fill():
+            nonlocal in_memory
+            while queue and len(pending) < workers:
+                needed = estimated_memory(queue[0])
+                if pending and in_memory + needed > memory_budget:
+                    break
+                image_info = queue.popleft()
+                future = executor.submit(resize_image, image_info['path'], output_folder, options)
+                pending[future] = (image_info['path'], needed)
+                in_memory += needed
+
+        fill()
+        while pending:
+            if cancel_event is not None and cancel_event.is_set():
+                for future in pending:
+                    future.cancel()
+                return
+            done, _ = wait(pending, timeout=CANCEL_POLL_INTERVAL, return_when=FIRST_COMPLETED)
+            for future in done:
+                path, needed = pending.pop(future)
+                in_memory -= needed
+                try:
+                    yield future.result()
+                except Exception as e:
+                    # The worker process died, e.g. killed for running out of memory
+                    yield {'path': path, 'error': str(e)}
+            fill()
+
+
+def _squared_error(img, reference):
+    """(sum of squared differences, number of values) of img against reference, in RGB"""
+    stat = ImageStat.Stat(ImageChops.difference(img.convert("RGB"), reference.convert("RGB")))
+    return sum(stat.sum2), sum(stat.count)
+
+
+def benchmark(paths, options):
+    """Resize each image at every speed in this process, without saving.
+
+    Returns [(speed, source megapixels per second, PSNR in dB against
+    the "quality" outputs)]. The PSNR comes from the mean squared error
+    over all images together, so identical outputs (e.g. images already
+    within the target size) don't make it infinite. Each file is read
+    once beforehand, so results reflect warm-cache decoding.
+    """
+    references = {}
+    results = []
+    for speed in SPEEDS:
+        pixels = 0
+        elapsed = 0
+        squared_error = values = 0
+        for path in paths:
+            with open(path, 'rb') as f:
+                f.read()
+            start = time.perf_counter()
+            with Image.open(path) as img:
+                pixels += img.width * img.height
+                img = scaled(img, target_size(img.width, img.height, options), speed)
+                img.load()
+            elapsed += time.perf_counter() - start
+            if speed == "quality":
+                references[path] = img
+            else:
+                image_error, image_values = _squared_error(img, references[path])
+                squared_error += image_error
+                values += image_values
+        psnr = 10 * math.log10(255 ** 2 * values / squared_error) if squared_error else math.inf
+        results.append((speed, pixels / 1e6 / max(elapsed, 1e-9), psnr))
+    return results
+
+
+if __name__ == "__main__":
+    folder = sys.argv[1] if len(sys.argv) > 1 else os.getcwd()
+    max_width, max_height = (int(sys.argv[2]), int(sys.argv[3])) if len(sys.argv) > 3 else (1920, 1080)
+    images = sorted(os.path.join(folder, name) for name in os.listdir(folder)
+                    if os.path.splitext(name)[1].lower() in BENCHMARK_EXTENSIONS)
+    print(f"Benchmarking {len(images)} images in {folder}, fit within {max_width}×{max_height}")
+    for speed, megapixels_per_s, psnr in benchmark(images, {'mode': "max", 'max_width': max_width,
+                                                           'max_height': max_height}):
+        print(f"{speed:<10} {megapixels_per_s:>8.1f} MP/s {psnr:>8.1f} dB PSNR vs quality")
@@ -0,0 +1,187 @@
+"""Perceptual near-duplicate image finder.
+
+Each image gets a 64-bit perceptual hash (dHash or pHash) computed with
+NumPy on a small grayscale Pillow downsample, so re-encoded or resized
+copies end up a few bits apart. Hashes are indexed in a BK-tree, which
+answers "everything within Hamming distance d" queries without
+comparing every pair of images.
+"""
+import time
+from collections import defaultdict
+
+import numpy as np
+from PIL import Image
+
+from duplicate_finder import CachedHasher
+from hash_engine import HashEngine
+
+HASH_SIZE = 8  # hashes are HASH_SIZE * HASH_SIZE bits
+DEFAULT_THRESHOLD = 6
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.gif', '.bmp', '.webp', '.tiff'}
+
+
+def _load_gray(path, size):
+    """Decode an image straight to a (height, width) float array of the given size"""
+    with Image.open(path) as img:
+        # Let JPEG decode at a reduced scale instead of full resolution
+        img.draft('L', (size[0] * 4, size[1] * 4))
+        img = img.convert('L').resize(size, Image.Resampling.BILINEAR)
+        return np.asarray(img, dtype=np.float32)
+
+
+def _bits_to_hex(bits):
+    return np.packbits(bits.ravel()).tobytes().hex()
+
+
+def dhash(path, hash_size=HASH_SIZE):
+    """Difference hash: is each pixel brighter than its right neighbour?"""
+    try:
+        pixels = _load_gray(path, (hash_size + 1, hash_size))
+        return _bits_to_hex(pixels[:, 1:] > pixels[:, :-1])
+    except Exception:
+        return None
+
+
+def _dct_matrix(n):
+    """Orthonormal DCT-II basis as an n x n matrix"""
+    k = np.arange(n)[:, None]
+    i = np.arange(n)[None, :]
+    matrix = np.cos(np.pi * (2 * i + 1) * k / (2 * n)) * np.sqrt(2.0 / n)
+    matrix[0] /= np.sqrt(2.0)
+    return matrix
+
+
+def phash(path, hash_size=HASH_SIZE, oversample=4):
+    """DCT hash: compare low-frequency DCT coefficients against their median"""
+    try:
+        n = hash_size * oversample
+        pixels = _load_gray(path, (n, n))
+        dct = _dct_matrix(n)
+        low = (dct @ pixels @ dct.T)[:hash_size, :hash_size]
+        return _bits_to_hex(low > np.median(low))
+    except Exception:
+        return None
+
+
+HASH_FUNCTIONS = {
+    "dhash": dhash,
+    "phash": phash,
+}
+
+
+def hamming(a, b):
+    return bin(a ^ b).count("1")
+
+
+class BKTree:
+    """Burkhard-Keller tree over integer hashes with Hamming distance.
+
+    Each node keeps the items whose hash is exactly its own, plus children
+    keyed by their distance to it. The triangle inequality limits a query
+    to children whose key lies within max_distance of the query distance.
+    """
+
+    def __init__(self):
+        self.root = None
+
+    def add(self, value, item):
+        if self.root is None:
+            self.root = [value, [item], {}]
+            return
+
+        node = self.root
+        while True:
+            distance = hamming(value, node[0])
+            if distance == 0:
+                node[1].append(item)
+                return
+            child = node[2].get(distance)
+            if child is None:
+                node[2][distance] = [value, [item], {}]
+                return
+            node = child
+
+    def query(self, value, max_distance):
+        """Return (distance, item) for every item within max_distance of value"""
+        results = []
+        if self.root is None:
+            return results
+
+        stack = [self.root]
+        while stack:
+            node_value, items, children = stack.pop()
+            distance = hamming(value, node_value)
+            if distance <= max_distance:
+                results.extend((distance, item) for item in items)
+            low, high = distance - max_distance, distance + max_distance
+            for child_distance, child in children.items():
+                if low <= child_distance <= high:
+                    stack.append(child)
+        return results
+
+
+def find_similar_images(file_stats, threshold=DEFAULT_THRESHOLD, method="dhash", cache=None,
+                        engine=None, cancel_event=None, on_progress=None):
+    """Group images whose perceptual hashes differ by at most threshold bits.
+
+    file_stats is {path: os.stat_result} for the images to compare.
+    Hashes are computed in parallel on engine (a process pool by default,
+    since decoding is CPU-bound) and reused from cache when unchanged.
+    Returns (groups, stats) where groups is a list of path lists, each
+    holding images connected by pairs within the threshold.
+    """
+    stats = {
+        'files': len(file_stats),
+        'bytes_read': 0,
+        'cache_hits': 0,
+        'cache_misses': 0,
+        'cache_mismatches': 0,
+        'hashed_files': 0,
+        'hashed_bytes': 0,
+        'expected_files': len(file_stats),
+        'expected_bytes': sum(st.st_size for st in file_stats.values()),
+        'started': time.monotonic(),
+    }
+    own_engine = engine is None
+    if own_engine:
+        engine = HashEngine(use_processes=True)
+    hasher = CachedHasher(file_stats, stats, engine, cache, cancel_event=cancel_event, on_progress=on_progress)
+    hash_func = HASH_FUNCTIONS[method]
+    kind = f"{method}{HASH_SIZE}"
+
+    tree = BKTree()
+    parent = {}
+
+    def find(path):
+        while parent[path] != path:
+            parent[path] = parent[parent[path]]
+            path = parent[path]
+        return path
+
+    try:
+        items = [(path, kind, hash_func, (), st.st_size) for path, st in file_stats.items()]
+        for path, image_hash in hasher.run(items):
+            if image_hash is None:
+                continue
+            value = int(image_hash, 16)
+            parent[path] = path
+            # Join this image with every already indexed image close to it
+            for _, other in tree.query(value, threshold):
+                root, other_root = find(path), find(other)
+                if root != other_root:
+                    parent[other_root] = root
+            tree.add(value, path)
+    finally:
+        if cache:
+            cache.flush()
+        if own_engine:
+            engine.close(wait=not hasher.cancelled())
+
+    clusters = defaultdict(list)
+    for path in parent:
+        clusters[find(path)].append(path)
+    groups = sorted((sorted(paths) for paths in clusters.values() if len(paths) > 1), key=lambda g: g[0])
+
+    stats['cancelled'] = hasher.cancelled()
+    stats['groups'] = len(groups)
+    return groups, stats
@@ -0,0 +1,196 @@
+"""Tk-free rename planning shared by both renamer UIs.
+
+A RenameEngine holds the rename options and turns a list of file
+records into a plan of (old_name, new_name) pairs. File records are
+dicts with at least 'name' and 'ctime' (the timestamp used for date
+sorting and date naming, which may be None when uses_creation_time() is
+false); template mode also uses 'path' and 'size'.
+Conflict checks are linear in the plan size.
+"""
+import os
+import re
+from datetime import datetime
+from functools import lru_cache
+
+from rename_template import RenameTemplate
+
+DATE_FORMATS = {
+    "YYYYMMDD": "%Y%m%d",
+    "YYYY-MM-DD": "%Y-%m-%d",
+    "DDMMYYYY": "%d%m%Y",
+    "DD-MM-YYYY": "%d-%m-%Y",
+    "MMDDYYYY": "%m%d%Y",
+}
+
+
+@lru_cache(maxsize=1 << 18)
+def format_timestamp(timestamp, date_format):
+    """strftime of a timestamp, memoized because live previews re-plan on every keystroke"""
+    return datetime.fromtimestamp(timestamp).strftime(date_format)
+
+
+@lru_cache(maxsize=64)
+def compile_find_pattern(find_text, use_regex=False, ignore_case=False, whole_name=False):
+    """Compiled pattern for a find & replace, cached on the text and flags.
+
+    Plain text is escaped; whole_name anchors the pattern to the whole
+    name (without extension). Raises ValueError for an invalid regex.
+    """
+    pattern = find_text if use_regex else re.escape(find_text)
+    if whole_name:
+        pattern = rf"\A(?:{pattern})\Z"
+    try:
+        return re.compile(pattern, re.IGNORECASE if ignore_case else 0)
+    except re.error as e:
+        raise ValueError(f"Invalid find regex: {e}")
+
+
+class RenameEngine:
+    def __init__(self, mode="pattern", pattern="file", find_text="", replace_text="",
+                 date_format="YYYYMMDD", date_position=None, sort_order="name",
+                 template="", template_regex="", find_regex=False, ignore_case=False, whole_name=False):
+        """date_position is "start", "end", or None to leave dates out.
+        sort_order is "name", "date_asc", "date_desc", or None to keep file order.
+        template and template_regex are used in "template" mode (see
+        rename_template); an invalid template raises ValueError here.
+        find_regex, ignore_case and whole_name refine "find_replace" mode;
+        with find_regex the replacement may use \\1 or \\g<name> groups.
+        """
+        self.mode = mode
+        self.pattern = pattern
+        self.find_text = find_text
+        self.replace_text = replace_text
+        self.date_format = DATE_FORMATS.get(date_format, "%Y%m%d")
+        self.date_position = date_position
+        self.sort_order = sort_order
+        self.template = RenameTemplate(template, template_regex) if mode == "template" else None
+
+        # Plain case-sensitive find & replace stays on str.replace
+        self.find_pattern = None
+        if mode == "find_replace" and (find_regex or ignore_case or whole_name):
+            self.find_pattern = compile_find_pattern(find_text, find_regex, ignore_case, whole_name)
+            # A plain-text replacement must not be parsed for group references
+            self.replacement = replace_text if find_regex else (lambda match: replace_text)
+
+    def uses_creation_time(self):
+        """True if the plan sorts or names files by their 'ctime'"""
+        if self.sort_order in ("date_asc", "date_desc"):
+            return True
+        if self.template is not None:
+            return self.template.uses_date
+        return self.mode in ("pattern", "date_only") and self.date_position is not None
+
+    def get_filtered_files(self, files, selected_names):
+        """Get only selected files and sort them"""
+        selected = [f for f in files if f['name'] in selected_names]
+
+        if self.sort_order == "name":
+            selected.sort(key=lambda x: x['name'].lower())
+        elif self.sort_order == "date_asc":
+            selected.sort(key=lambda x: x['ctime'])
+        elif self.sort_order == "date_desc":
+            selected.sort(key=lambda x: x['ctime'], reverse=True)
+
+        return selected
+
+    def format_date(self, timestamp):
+        return format_timestamp(timestamp, self.date_format)
+
+    def add_date(self, base_name, file_info):
+        if self.date_position is None:
+            return base_name
+        date_str = self.format_date(file_info['ctime'])
+        if self.date_position == "start":
+            return f"{date_str}_{base_name}"
+        return f"{base_name}_{date_str}"
+
+    def generate_new_name(self, file_info, index):
+        """Generate the new filename for the index-th file of the plan"""
+        if self.template is not None:
+            return self.template.render(file_info, index)
+
+        base_name, ext = os.path.splitext(file_info['name'])
+
+        if self.mode == "date_only":
+            # Keep original name and just add date
+            return f"{self.add_date(base_name, file_info)}{ext}"
+        elif self.mode == "find_replace":
+            if self.find_pattern is None:
+                return f"{base_name.replace(self.find_text, self.replace_text)}{ext}"
+            try:
+                new_base, count = self.find_pattern.subn(self.replacement, base_name)
+            except (re.error, IndexError) as e:
+                raise ValueError(f"Invalid replacement: {e}")
+            if not count:
+                return file_info['name']  # no match: the name stays as it is
+            return f"{new_base}{ext}"
+        else:
+            # Pattern rename mode
+            return f"{self.add_date(f'{self.pattern}_{str(index + 1).zfill(3)}', file_info)}{ext}"
+
+    def plan(self, files, selected_names=None, start=0):
+        """Return [(old_name, new_name)] for the selected files, in sorted order.
+
+        With selected_names None, files is used as-is and not re-sorted.
+        Counters begin at start + 1.
+        """
+        if selected_names is not None:
+            files = self.get_filtered_files(files, selected_names)
+        generate = self.generate_new_name
+        return [(file_info['name'], generate(file_info, index)) for index, file_info in enumerate(files, start)]
+
+
+def invalid_name_reason(name):
+    """Why name can't be a file name in the same folder, or None if it can"""
+    if not name.strip():
+        return "is empty"
+    if name in (".", ".."):
+        return "is reserved"
+    if "/" in name or os.sep in name or (os.altsep and os.altsep in name):
+        return "contains a path separator"
+    if "\0" in name:
+        return "contains a null character"
+    return None
+
+
+def find_conflicts(rename_map, existing_names):
+    """Return (duplicated_new_names, names_taken_by_other_files).
+
+    existing_names is the set of names currently in the folder. A new
+    name only clashes with an existing file if that file is not itself
+    being renamed away.
+    """
+    seen = set()
+    duplicated = set()
+    for _, new_name in rename_map:
+        if new_name in seen:
+            duplicated.add(new_name)
+        seen.add(new_name)
+
+    renamed_from = {old_name for old_name, _ in rename_map}
+    taken = [new_name for _, new_name in rename_map
+             if new_name in existing_names and new_name not in renamed_from]
+
+    return duplicated, taken
+
+
+def check_conflicts(rename_map, existing_names, max_listed=10):
+    """Check for invalid names and naming conflicts, returning (has_conflict, message)"""
+    for old_name, new_name in rename_map:
+        reason = invalid_name_reason(new_name)
+        if reason:
+            return True, f"Invalid name for '{old_name}': '{new_name}' {reason}."
+
+    duplicated, taken = find_conflicts(rename_map, existing_names)
+
+    if duplicated:
+        names = sorted(duplicated)
+        listed = ", ".join(names[:max_listed])
+        if len(names) > max_listed:
+            listed += f" and {len(names) - max_listed} more"
+        return True, f"Conflict detected! These names would be duplicated: {listed}"
+
+    if taken:
+        return True, f"Conflict detected! '{taken[0]}' already exists in the folder."
+
+    return False, ""
@@ -0,0 +1,197 @@
+"""Cycle-safe execution of rename plans.
+
+os.rename() silently replaces an existing target on Linux, so running a
+plan like a->b, b->c in list order would destroy files. Since every
+target in a valid plan is unique, the plan's dependency graph ("b must
+move before a can take its name") is a set of disjoint chains and
+cycles. Chains run from their free end backwards; each cycle is broken
+by moving one member to a temporary name first. The resulting steps are
+in topological order, so the whole plan runs in a single pass and no
+step ever lands on an occupied name.
+"""
+import os
+import uuid
+
+
+def _temp_name():
+    """A hidden name of fixed length, so long names can still be parked"""
+    return f".rn-{uuid.uuid4().hex}"
+
+
+def order_renames(rename_map):
+    """Turn [(old_name, new_name)] into steps that are safe to run in order.
+
+    Returns [(src, dst)] where some steps may go through temporary names.
+    Unchanged names are dropped. Raises ValueError if two files would
+    get the same new name.
+    """
+    moves = {}
+    movers_into = {}
+    for old_name, new_name in rename_map:
+        if old_name == new_name:
+            continue
+        if new_name in movers_into:
+            raise ValueError(f"'{new_name}' is the target of more than one rename")
+        moves[old_name] = new_name
+        movers_into[new_name] = old_name
+
+    steps = []
+    done = set()
+
+    # Chains: start at renames whose target is not being vacated, then walk
+    # back to whoever wants the name that was just freed
+    for old_name, new_name in moves.items():
+        if new_name in moves:
+            continue
+        current = old_name
+        while current is not None and current not in done:
+            done.add(current)
+            steps.append((current, moves[current]))
+            current = movers_into.get(current)
+
+    # Whatever is left forms cycles: park one member under a temporary name
+    for old_name in moves:
+        if old_name in done:
+            continue
+        temp_name = _temp_name()
+        done.add(old_name)
+        steps.append((old_name, temp_name))
+        current = movers_into[old_name]
+        while current != old_name:
+            done.add(current)
+            steps.append((current, moves[current]))
+            current = movers_into[current]
+        steps.append((temp_name, moves[old_name]))
+
+    return steps
+
+
+def _rename_step(folder_path, src, dst):
+    """Rename src to dst unless that would replace another file.
+
+    The target is checked right before every rename, even when a fresh
+    snapshot says it is free: directory mtimes are coarse on some
+    filesystems and may be stale on network shares.
+    """
+    src_path = os.path.join(folder_path, src)
+    dst_path = os.path.join(folder_path, dst)
+    # A case-only rename finds src itself on case-insensitive filesystems. Any
+    # other name that is the same file is a hardlink, and renaming onto it
+    # would succeed without doing anything.
+    if os.path.lexists(dst_path) and not (src.casefold() == dst.casefold() and os.path.samefile(src_path, dst_path)):
+        raise FileExistsError(f"'{dst}' already exists in the folder")
+    os.rename(src_path, dst_path)
+
+
+def _undo_steps(folder_path, steps):
+    """Revert completed steps in reverse order, returning False if any could not be reverted"""
+    clean = True
+    for src, dst in reversed(steps):
+        try:
+            os.rename(os.path.join(folder_path, dst), os.path.join(folder_path, src))
+        except OSError:
+            clean = False
+    return clean
+
+
+def execute_renames(folder_path, rename_map, on_renamed=None, journal=None, undoes=None, snapshot=None,
+                    group=None):
+    """Rename files in folder_path according to [(old_name, new_name)].
+
+    Steps run in the order given by order_renames(). A step never
+    replaces an existing file. If any step fails, the completed steps
+    are reverted in reverse order and the error is re-raised, so the
+    folder is left as it was. on_renamed(old_name, new_name) is called
+    for each plan entry once the whole plan has succeeded.
+
+    With a RenameJournal the batch is logged before it starts and
+    committed at the end; undoes is the id of the batch this one reverts
+    and group ties together the batches of one recursive rename.
+    snapshot is a FolderSnapshot that the caller has just checked is
+    current; its stats then replace per-file stat calls for the journal.
+    """
+    steps = order_renames(rename_map)
+    batch = None
+    if journal:
+        inodes = _step_inodes(folder_path, steps, snapshot.inodes if snapshot else None)
+        batch = journal.begin(folder_path, rename_map, steps, inodes, undoes, group)
+    done = 0
+
+    try:
+        for src, dst in steps:
+            _rename_step(folder_path, src, dst)
+            done += 1
+            if batch:
+                journal.progress(batch, done)
+    except Exception:
+        reverted = _undo_steps(folder_path, steps[:done])
+        if batch and reverted:
+            journal.abort(batch)  # otherwise it stays open for recovery
+        raise
+
+    if batch:
+        journal.commit(batch)
+
+    if on_renamed:
+        for old_name, new_name in rename_map:
+            if old_name != new_name:
+                on_renamed(old_name, new_name)
+
+    return len(steps)
+
+
+def _step_inodes(folder_path, steps, known_inodes=None):
+    """Inode of the file each step moves, so recovery can tell which steps ran"""
+    inodes = dict(known_inodes) if known_inodes else {}
+    result = []
+    for src, dst in steps:
+        ino = inodes.get(src)
+        if ino is None:
+            ino = os.lstat(os.path.join(folder_path, src)).st_ino
+        inodes[dst] = ino  # a temporary name keeps the file's inode
+        result.append(ino)
+    return result
+
+
+def _is_at(folder_path, name, ino):
+    try:
+        return os.lstat(os.path.join(folder_path, name)).st_ino == ino
+    except OSError:
+        return False
+
+
+def _steps_done(folder_path, steps, inodes, start):
+    """Count the steps of an interrupted batch that had run.
+
+    Steps run strictly in order and everything before start is known to
+    have run. A step ran if its file is at its target, or, for a move to
+    a temporary name, already at the name it moved on to.
+    """
+    moved_on = {}
+    for src, dst in steps:
+        moved_on[src] = dst
+
+    done = start
+    while done < len(steps):
+        dst, ino = steps[done][1], inodes[done]
+        if not (_is_at(folder_path, dst, ino) or
+                (dst in moved_on and _is_at(folder_path, moved_on[dst], ino))):
+            break
+        done += 1
+    return done
+
+
+def resume_batch(journal, batch, roll_forward):
+    """Finish (roll_forward=True) or revert an interrupted journal batch"""
+    folder_path = batch['folder']
+    steps = [tuple(step) for step in batch['steps']]
+    done = _steps_done(folder_path, steps, batch['inodes'], batch.get('done', 0))
+
+    if roll_forward:
+        for src, dst in steps[done:]:
+            _rename_step(folder_path, src, dst)
+        journal.commit(batch)
+    else:
+        if not _undo_steps(folder_path, steps[:done]):
+            raise OSError("Some files could not be restored to their original names")
+        journal.abort(batch)
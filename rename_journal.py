@@ -0,0 +1,306 @@
+"""Append-only write-ahead journal for rename batches.
+
+Before a batch runs, its plan and the exact steps (including temporary
+names) are appended and fsynced. Progress markers are written every
+FSYNC_EVERY steps, after the folder itself has been synced, and a commit
+or abort record closes the batch. A batch without one of those was
+interrupted and can be rolled forward or back on the next start (see
+rename_executor.resume_batch). Committed batches also form the undo
+stack, which therefore survives restarts. Batches that share a group id
+(one per folder of a recursive rename) are undone together and count as
+one operation towards the undo depth. The journal may be used from
+several threads at once, and by several processes (both apps share one
+file): loading, compaction and every append hold an exclusive lock on a
+side file, and a process whose journal was compacted by another reopens
+it before appending. Each open batch also holds a lock file of its own
+(under journal + ".locks") until it is committed or aborted, so a batch
+still running in another process is not mistaken for an interrupted one:
+it is left out of incomplete, and the journal is not compacted under it.
+
+Records are JSON lines:
+    {"op": "begin", "id", "time", "folder", "plan", "steps", "inodes", "undoes", "group"}
+    {"op": "progress", "id", "done"}
+    {"op": "commit", "id"} / {"op": "abort", "id"}
+"""
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+try:
+    import msvcrt
+except ImportError:
+    msvcrt = None
+
+DEFAULT_JOURNAL_FILE = os.path.join(os.path.expanduser("~"), ".file_tools_rename_journal.jsonl")
+DEFAULT_UNDO_DEPTH = 10
+# Steps between progress markers (each costs a folder and a journal fsync)
+FSYNC_EVERY = 2000
+
+
+def _lock_file(f, blocking=True):
+    """Lock f exclusively; without blocking, return False if another process holds it"""
+    try:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+        elif msvcrt is not None:
+            f.seek(0)
+            # LK_LOCK retries for 10 s, then raises OSError
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK if blocking else msvcrt.LK_NBLCK, 1)
+    except OSError:
+        if blocking:
+            raise
+        return False
+    return True
+
+
+def _unlock_file(f):
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+    elif msvcrt is not None:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def fsync_dir(path):
+    """Make renames inside path durable; a no-op where directories can't be opened"""
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def _undo_record(batch):
+    """A committed batch only needs its plan to be undone"""
+    return {k: v for k, v in batch.items() if k not in ('steps', 'inodes', 'done')}
+
+
+def group_key(batch):
+    """Batches of one operation share a group; a lone batch is its own group"""
+    return batch.get('group') or batch['id']
+
+
+def _last_groups(batches, count):
+    """The batches belonging to the last count groups"""
+    keep = set()
+    for batch in reversed(batches):
+        if len(keep) == count and group_key(batch) not in keep:
+            break
+        keep.add(group_key(batch))
+    return [batch for batch in batches if group_key(batch) in keep]
+
+
+class RenameJournal:
+    def __init__(self, journal_path=DEFAULT_JOURNAL_FILE, undo_depth=DEFAULT_UNDO_DEPTH):
+        """With journal_path None nothing is written and undo lasts for the session only"""
+        self.journal_path = journal_path
+        self.undo_depth = undo_depth
+        self.incomplete = []  # begin records of interrupted batches
+        self.undo_stack = []  # begin records of committed batches, newest last
+        self.file = None
+        self.lock_file = None
+        self.batch_locks = {}  # batch id -> open, locked lock file of a batch running here
+        self.lock = threading.Lock()
+        if journal_path:
+            self.lock_file = open(journal_path + ".lock", 'a+b')
+            os.makedirs(self._locks_dir(), exist_ok=True)
+            with self._exclusive():
+                self._load()
+                self.file = open(journal_path, 'a', encoding='utf-8')
+
+    @contextmanager
+    def _exclusive(self):
+        """Hold the journal against other threads and other processes"""
+        with self.lock:
+            _lock_file(self.lock_file)
+            try:
+                yield
+            finally:
+                _unlock_file(self.lock_file)
+
+    def _locks_dir(self):
+        return self.journal_path + ".locks"
+
+    def _batch_lock_path(self, batch_id):
+        return os.path.join(self._locks_dir(), f"{batch_id}.lock")
+
+    def _running_elsewhere(self, batch_id):
+        """True if another process holds the batch's lock, i.e. is still running it"""
+        try:
+            f = open(self._batch_lock_path(batch_id), 'rb+')
+        except OSError:
+            return False  # no lock file: its process finished or never got that far
+        with f:
+            if not _lock_file(f, blocking=False):
+                return True
+            _unlock_file(f)
+            return False
+
+    def _load(self):
+        batches = {}
+        progress = {}
+        undo_stack = []
+        records = 0
+
+        try:
+            with open(self.journal_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue  # torn final line from a crash
+                    records += 1
+                    op, batch_id = record.get('op'), record.get('id')
+                    if op == 'begin':
+                        batches[batch_id] = record
+                    elif op == 'progress':
+                        progress[batch_id] = record['done']
+                    elif op in ('commit', 'abort') and batch_id in batches:
+                        batch = batches.pop(batch_id)
+                        if op == 'commit':
+                            undone = batch.get('undoes')
+                            if undone:
+                                undo_stack = [b for b in undo_stack if b['id'] != undone]
+                            else:
+                                undo_stack.append(_undo_record(batch))
+        except FileNotFoundError:
+            return
+
+        running = [batch_id for batch_id in batches if self._running_elsewhere(batch_id)]
+        for batch_id in running:
+            del batches[batch_id]
+        for batch_id, batch in batches.items():
+            batch['done'] = progress.get(batch_id, 0)
+        self.incomplete = list(batches.values())
+        self.undo_stack = _last_groups(undo_stack, self.undo_depth)
+
+        # Compacting would drop the records of batches other processes are still running
+        live = 2 * len(self.undo_stack) + sum(2 if batch['done'] else 1 for batch in self.incomplete)
+        if records > live and not running:
+            self._compact()
+
+    def _compact(self):
+        """Rewrite the journal with only the records that still matter"""
+        temp_path = self.journal_path + ".tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            for batch in self.undo_stack:
+                f.write(json.dumps(batch) + "\n")
+                f.write(json.dumps({'op': 'commit', 'id': batch['id']}) + "\n")
+            for batch in self.incomplete:
+                record = {k: v for k, v in batch.items() if k != 'done'}
+                f.write(json.dumps(record) + "\n")
+                if batch['done']:
+                    f.write(json.dumps({'op': 'progress', 'id': batch['id'], 'done': batch['done']}) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self.journal_path)
+
+    def _append(self, record):
+        if self.file is None:
+            return
+        line = json.dumps(record) + "\n"
+        with self._exclusive():
+            try:
+                replaced = not os.path.samestat(os.fstat(self.file.fileno()), os.stat(self.journal_path))
+            except FileNotFoundError:
+                replaced = True
+            if replaced:
+                # Another process compacted the journal since it was opened
+                self.file.close()
+                self.file = open(self.journal_path, 'a', encoding='utf-8')
+            self.file.write(line)
+            self.file.flush()
+            os.fsync(self.file.fileno())
+
+    def _append_synced(self, batch, record):
+        """Append a record once the batch's renames so far are on disk"""
+        if self.file is not None:
+            fsync_dir(batch['folder'])
+            self._append(record)
+
+    def begin(self, folder_path, rename_map, steps, inodes, undoes=None, group=None):
+        """Durably record a batch before any of its steps run; returns its begin record"""
+        batch = {
+            'op': 'begin',
+            'id': uuid.uuid4().hex,
+            'time': time.time(),
+            'folder': folder_path,
+            'plan': rename_map,
+            'steps': steps,
+            'inodes': inodes,
+            'undoes': undoes,
+            'group': group,
+        }
+        if self.file is not None:
+            lock = open(self._batch_lock_path(batch['id']), 'a+b')
+            _lock_file(lock)
+            with self.lock:
+                self.batch_locks[batch['id']] = lock
+        self._append(batch)
+        return batch
+
+    def progress(self, batch, done):
+        """Called after each step; every FSYNC_EVERY steps the progress is made durable"""
+        if done % FSYNC_EVERY == 0:
+            self._append_synced(batch, {'op': 'progress', 'id': batch['id'], 'done': done})
+
+    def commit(self, batch):
+        self._append_synced(batch, {'op': 'commit', 'id': batch['id']})
+        with self.lock:
+            self._finish(batch)
+            undone = batch.get('undoes')
+            if undone:
+                self.undo_stack = [b for b in self.undo_stack if b['id'] != undone]
+            else:
+                self.undo_stack.append(_undo_record(batch))
+                self.undo_stack = _last_groups(self.undo_stack, self.undo_depth)
+
+    def abort(self, batch):
+        self._append_synced(batch, {'op': 'abort', 'id': batch['id']})
+        with self.lock:
+            self._finish(batch)
+
+    def _finish(self, batch):
+        self.incomplete = [b for b in self.incomplete if b['id'] != batch['id']]
+        lock = self.batch_locks.pop(batch['id'], None)
+        if self.file is not None:
+            try:
+                os.remove(self._batch_lock_path(batch['id']))  # also a recovered batch's stale one
+            except OSError:
+                pass
+        if lock is not None:
+            _unlock_file(lock)
+            lock.close()
+
+    def last_undoable(self):
+        """Begin records of the most recent operation that can be undone, or [] if none"""
+        if not self.undo_stack:
+            return []
+        key = group_key(self.undo_stack[-1])
+        return [batch for batch in self.undo_stack if group_key(batch) == key]
+
+    def undo_count(self):
+        """Number of operations that can be undone"""
+        return len({group_key(batch) for batch in self.undo_stack})
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+        if self.lock_file is not None:
+            self.lock_file.close()
+        # Batches left open are interrupted now; their lock files stay for recovery to find
+        for lock in self.batch_locks.values():
+            lock.close()
+        self.batch_locks = {}
@@ -0,0 +1,189 @@
+"""Template rename mode, e.g. "{date:%Y%m%d}_{camera}_{n:05}{ext}".
+
+A template is parsed once with string.Formatter into literal text and
+field getters, so rendering a name is one pass over a short list.
+Fields:
+
+    {name}          original name without extension
+    {ext}           extension including the dot
+    {n}             counter starting at 1, e.g. {n:05}
+    {date}          file date (creation time), strftime spec, e.g. {date:%Y-%m-%d}
+    {parent}        name of the containing folder
+    {size}          size in bytes, e.g. {size:,}
+    {1}, {2}, ...   capture groups of the match regex against the name
+    {g:label}       named capture group of the match regex
+    {camera}        EXIF make and model; also {make}, {model}
+    {taken}         EXIF DateTimeOriginal, strftime spec like {date}
+    {exif:Tag}      any EXIF tag by name, e.g. {exif:LensModel}
+
+EXIF is read only when the template uses an EXIF field, and at most
+once per file.
+"""
+import os
+import re
+import string
+from datetime import datetime
+
+try:
+    from PIL import Image, ExifTags
+except ImportError:
+    # Pillow not installed: EXIF fields render as empty text
+    Image = None
+
+DEFAULT_DATE_FORMAT = "%Y%m%d"
+EXIF_IFD = 0x8769
+EXIF_DATE_FORMAT = "%Y:%m:%d %H:%M:%S"
+# Characters that can't appear in a file name are replaced in rendered names
+UNSAFE_CHARS = re.compile(r'[/\\:*?"<>|\x00-\x1f]')
+
+
+def read_exif(path):
+    """Return {tag_name: value} from the base and Exif IFDs, or {} if unreadable"""
+    if Image is None:
+        return {}
+    try:
+        with Image.open(path) as img:
+            exif = img.getexif()
+            tags = dict(exif)
+            tags.update(exif.get_ifd(EXIF_IFD))
+    except Exception:
+        return {}
+    return {ExifTags.TAGS.get(tag, str(tag)): value for tag, value in tags.items()}
+
+
+def _text(value):
+    if isinstance(value, bytes):
+        value = value.decode(errors="ignore")
+    return str(value).strip().strip("\x00")
+
+
+def exif_datetime(tags):
+    value = tags.get("DateTimeOriginal") or tags.get("DateTime")
+    try:
+        return datetime.strptime(_text(value), EXIF_DATE_FORMAT)
+    except (TypeError, ValueError):
+        return None
+
+
+def _camera(tags):
+    make, model = _text(tags.get("Make", "")), _text(tags.get("Model", ""))
+    # Many cameras repeat the make in the model name
+    if make and model.lower().startswith(make.lower()):
+        return model
+    return f"{make} {model}".strip()
+
+
+class _File:
+    """Per-file values needed while rendering, with EXIF loaded on first use"""
+
+    def __init__(self, file_info, index, match):
+        self.info = file_info
+        self.stem, self.ext = os.path.splitext(file_info['name'])
+        self.index = index
+        self.match = match
+        self._exif = None
+
+    @property
+    def exif(self):
+        if self._exif is None:
+            self._exif = read_exif(self.info['path'])
+        return self._exif
+
+
+def _date_field(get_datetime, spec):
+    date_format = spec or DEFAULT_DATE_FORMAT
+
+    def render(f):
+        value = get_datetime(f)
+        return value.strftime(date_format) if value else ""
+    return render
+
+
+def _value_field(get_value, spec):
+    if not spec:
+        return lambda f: str(get_value(f))
+    return lambda f: format(get_value(f), spec)
+
+
+def _group(f, key):
+    return (f.match.group(key) or "") if f.match else ""
+
+
+def _compile_field(field, spec, regex):
+    """Return render(f) for one {field:spec}"""
+    if field.isdigit():
+        group = int(field)
+        if regex is None or group > regex.groups:
+            raise ValueError(f"{{{field}}} needs a match regex with at least {group} group(s)")
+        return _value_field(lambda f: _group(f, group), spec)
+
+    kind, _, arg = field.partition(":")
+    if kind == "g":
+        if regex is None or arg not in regex.groupindex:
+            raise ValueError(f"{{g:{arg}}} needs a match regex with a group named '{arg}'")
+        return _value_field(lambda f: _group(f, arg), spec)
+    if kind == "exif":
+        if not arg:
+            raise ValueError("{exif:Tag} needs a tag name")
+        return _value_field(lambda f: _text(f.exif.get(arg, "")), spec)
+    if arg:
+        raise ValueError(f"Unknown template field '{{{field}}}'")
+
+    if field == "name":
+        return _value_field(lambda f: f.stem, spec)
+    if field == "ext":
+        return _value_field(lambda f: f.ext, spec)
+    if field == "n":
+        return _value_field(lambda f: f.index + 1, spec)
+    if field == "date":
+        return _date_field(lambda f: datetime.fromtimestamp(f.info['ctime']), spec)
+    if field == "taken":
+        return _date_field(lambda f: exif_datetime(f.exif), spec)
+    if field == "parent":
+        return _value_field(lambda f: os.path.basename(os.path.dirname(f.info['path'])), spec)
+    if field == "size":
+        return _value_field(lambda f: f.info['size'], spec)
+    if field == "camera":
+        return _value_field(lambda f: _camera(f.exif), spec)
+    if field in ("make", "model"):
+        tag = field.capitalize()
+        return _value_field(lambda f: _text(f.exif.get(tag, "")), spec)
+    raise ValueError(f"Unknown template field '{{{field}}}'")
+
+
+class RenameTemplate:
+    def __init__(self, template, match_regex=""):
+        """Parse and compile template; raises ValueError if it is invalid"""
+        try:
+            self.regex = re.compile(match_regex) if match_regex else None
+        except re.error as e:
+            raise ValueError(f"Invalid match regex: {e}")
+
+        self.parts = []
+        self.uses_date = False  # whether any field reads 'ctime'
+        try:
+            parsed = list(string.Formatter().parse(template))
+        except ValueError as e:
+            raise ValueError(f"Invalid template: {e}")
+
+        for literal, field, spec, conversion in parsed:
+            if literal:
+                self.parts.append(literal)
+            if field is None:
+                continue
+            if not field:
+                raise ValueError("Empty {} in template")
+            # Formatter splits "{exif:Tag}" into field "exif" and spec "Tag"
+            if field in ("g", "exif"):
+                field, spec = f"{field}:{spec}", ""
+            self.parts.append(_compile_field(field, spec, self.regex))
+            self.uses_date = self.uses_date or field == "date"
+
+        if not self.parts:
+            raise ValueError("Template is empty")
+
+    def render(self, file_info, index):
+        """Return the new name for the index-th file of a batch"""
+        match = self.regex.search(file_info['name']) if self.regex else None
+        f = _File(file_info, index, match)
+        return UNSAFE_CHARS.sub("_", "".join([part if part.__class__ is str else part(f) for part in self.parts]))
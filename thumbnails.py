@@ -0,0 +1,182 @@
+"""Thumbnail service for the renamer's image preview.
+
+Thumbnails are made off the Tk thread and kept at three levels:
+
+    memory  an LRU of decoded thumbnails (PIL images, ready for
+            ImageTk.PhotoImage), keyed by path and mtime
+    disk    small JPEG/PNG files under cache_dir, named by a hash of
+            the path, mtime and size, so they survive restarts and go
+            stale by themselves when a file changes
+    decode  JPEGs are decoded in draft mode, which lets libjpeg scale
+            by 1/2, 1/4 or 1/8 while decoding, so a 50 MP photo is never
+            decoded at full size; only the last step is resampled
+
+request() returns a Future; callers on the Tk thread poll it. prefetch()
+warms the cache for rows the user is likely to look at next, and drops
+prefetches that have not started when newer ones arrive.
+"""
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from PIL import Image
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".file_tools_thumbnails")
+THUMBNAIL_SIZE = (250, 250)
+MEMORY_ENTRIES = 200  # about 190 KB each at 250x250 RGB
+DISK_CACHE_MAX_BYTES = 200 * 1024 * 1024
+JPEG_QUALITY = 85
+
+
+def make_thumbnail(path, size=THUMBNAIL_SIZE):
+    """Decode path into a thumbnail no larger than size (RGB, RGBA or L)"""
+    with Image.open(path) as img:
+        # JPEG only: pick the DCT scale that still covers size
+        img.draft("RGB", size)
+        img.thumbnail(size, Image.Resampling.LANCZOS)
+        if img.mode not in ("RGB", "RGBA", "L"):
+            has_alpha = img.mode in ("LA", "PA") or "transparency" in img.info
+            img = img.convert("RGBA" if has_alpha else "RGB")
+        img.load()
+        return img
+
+
+def prune_disk_cache(cache_dir, max_bytes=DISK_CACHE_MAX_BYTES):
+    """Delete the least recently written thumbnails until the cache fits in max_bytes"""
+    try:
+        with os.scandir(cache_dir) as entries:
+            files = [(entry.stat().st_mtime, entry.stat().st_size, entry.path)
+                     for entry in entries if entry.is_file()]
+    except OSError:
+        return
+    total = sum(size for _, size, _ in files)
+    for _, size, path in sorted(files):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+            total -= size
+        except OSError:
+            pass
+
+
+class ThumbnailService:
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, size=THUMBNAIL_SIZE, memory_entries=MEMORY_ENTRIES, workers=2):
+        """With cache_dir None thumbnails are only kept in memory"""
+        self.cache_dir = cache_dir
+        self.size = size
+        self.memory_entries = memory_entries
+        self.memory = OrderedDict()  # (path, mtime_ns) -> PIL image, most recently used last
+        self.pending = {}  # (path, mtime_ns) -> [Future, prefetch generation or None if requested]
+        self.lock = threading.Lock()
+        self.prefetch_generation = 0
+        self.pool = ThreadPoolExecutor(max_workers=workers)
+
+        if cache_dir:
+            try:
+                os.makedirs(cache_dir, exist_ok=True)
+                self.pool.submit(prune_disk_cache, cache_dir)
+            except OSError:
+                self.cache_dir = None
+
+    def _key(self, path):
+        stat = os.stat(path)
+        return (path, stat.st_mtime_ns), stat.st_size
+
+    def _disk_path(self, key, file_size, ext):
+        path, mtime_ns = key
+        digest = hashlib.sha1(f"{os.path.abspath(path)}\0{mtime_ns}\0{file_size}".encode(errors="surrogateescape"))
+        return os.path.join(self.cache_dir, digest.hexdigest() + ext)
+
+    def _remember(self, key, image):
+        with self.lock:
+            self.memory[key] = image
+            self.memory.move_to_end(key)
+            while len(self.memory) > self.memory_entries:
+                self.memory.popitem(last=False)
+
+    def cached(self, path):
+        """The thumbnail if it is in memory, else None; raises OSError if path can't be stat'ed"""
+        key, _ = self._key(path)
+        with self.lock:
+            image = self.memory.get(key)
+            if image is not None:
+                self.memory.move_to_end(key)
+            return image
+
+    def _load(self, key, file_size):
+        """Thumbnail from the disk cache, or decoded and written to it"""
+        if self.cache_dir:
+            for ext in (".jpg", ".png"):
+                try:
+                    with Image.open(self._disk_path(key, file_size, ext)) as img:
+                        img.load()
+                        return img
+                except (OSError, ValueError):
+                    continue
+
+        image = make_thumbnail(key[0], self.size)
+        if self.cache_dir:
+            self._save(image, self._disk_path(key, file_size, ".png" if image.mode == "RGBA" else ".jpg"))
+        return image
+
+    def _save(self, image, disk_path):
+        temp_path = f"{disk_path}.{threading.get_ident()}.tmp"
+        try:
+            if image.mode == "RGBA":
+                image.save(temp_path, "PNG")
+            else:
+                image.save(temp_path, "JPEG", quality=JPEG_QUALITY)
+            os.replace(temp_path, disk_path)
+        except OSError:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+
+    def _make(self, key, file_size):
+        # A prefetch that was superseded before it started is skipped
+        with self.lock:
+            generation = self.pending[key][1]
+            if generation is not None and generation != self.prefetch_generation:
+                del self.pending[key]
+                return None
+        try:
+            image = self._load(key, file_size)
+            self._remember(key, image)
+            return image
+        finally:
+            with self.lock:
+                self.pending.pop(key, None)
+
+    def request(self, path, generation=None):
+        """Future of the thumbnail of path; raises OSError if path can't be stat'ed"""
+        key, file_size = self._key(path)
+        with self.lock:
+            image = self.memory.get(key)
+            if image is None:
+                pending = self.pending.get(key)
+                if pending is None:
+                    pending = self.pending[key] = [None, generation]
+                    pending[0] = self.pool.submit(self._make, key, file_size)
+                elif pending[1] is not None:
+                    pending[1] = generation  # a request (None) keeps it from being skipped
+                return pending[0]
+            self.memory.move_to_end(key)
+        future = Future()
+        future.set_result(image)
+        return future
+
+    def prefetch(self, paths):
+        """Make thumbnails for paths in the background, replacing earlier prefetches"""
+        self.prefetch_generation += 1
+        for path in paths:
+            try:
+                self.request(path, self.prefetch_generation)
+            except OSError:
+                continue
+
+    def close(self):
+        self.pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,159 @@
+"""Renaming across a whole folder tree, one directory at a time.
+
+A rename never moves a file to another directory, so every directory
+of a tree is an independent rename batch: it is planned, conflict
+checked, journaled and rolled back on its own, and different directories
+can't interfere. Their batches run concurrently on a thread pool; renames
+are system calls that release the GIL, and on network shares most of
+the time is spent waiting for the server. All batches of one run share
+a journal group, so the whole tree is undone as one operation.
+
+Plans are {folder_path: [(old_name, new_name)]}. Counters restart in
+each folder unless a global counter is asked for, in which case they
+continue across folders in path order.
+"""
+import os
+import uuid
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from file_walker import DEFAULT_EXCLUDED_DIRS
+from folder_snapshot import FolderSnapshot
+from rename_engine import check_conflicts
+from rename_executor import execute_renames, resume_batch
+from rename_journal import group_key
+
+# Folders renamed (or listed) at the same time
+DEFAULT_WORKERS = 8
+
+
+class FolderTree:
+    def __init__(self, root, snapshots):
+        self.root = root
+        self.snapshots = snapshots  # {folder_path: FolderSnapshot}, root first
+
+    @classmethod
+    def capture(cls, root, recursive=False, exclude_dirs=DEFAULT_EXCLUDED_DIRS, workers=DEFAULT_WORKERS):
+        """Snapshot root, and with recursive every folder below it, listing a level at a time in parallel"""
+        snapshots = {root: FolderSnapshot.capture(root)}
+        level = list(snapshots.values())
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            while recursive and level:
+                folders = [path for snapshot in level for path in snapshot.subfolders
+                           if os.path.basename(path) not in exclude_dirs]
+                level = [snapshot for snapshot in pool.map(_try_capture, folders) if snapshot]
+                for snapshot in level:
+                    snapshots[snapshot.folder_path] = snapshot
+        return cls(root, snapshots)
+
+    def relative(self, folder_path, name):
+        """Path of a file relative to the root, for display"""
+        if folder_path == self.root:
+            return name
+        return os.path.join(os.path.relpath(folder_path, self.root), name)
+
+    def is_current(self):
+        """True if no folder of the tree changed since capture"""
+        return all(snapshot.is_current() for snapshot in self.snapshots.values())
+
+
+def _try_capture(folder_path):
+    try:
+        return FolderSnapshot.capture(folder_path)
+    except OSError:
+        return None  # unreadable subfolders are left out
+
+
+def plan_tree(engine, files, selected_paths, global_counter=False):
+    """Plan each folder's selected files with a RenameEngine.
+
+    files are file dicts with a 'folder' key. Returns {folder_path: plan}
+    for the folders that have selected files, in path order.
+    """
+    by_folder = {}
+    for file_info in files:
+        by_folder.setdefault(file_info['folder'], []).append(file_info)
+
+    plans = {}
+    start = 0
+    for folder_path in sorted(by_folder):
+        folder_files = by_folder[folder_path]
+        names = {file_info['name'] for file_info in folder_files if file_info['path'] in selected_paths}
+        if not names:
+            continue
+        plans[folder_path] = engine.plan(folder_files, names, start)
+        if global_counter:
+            start += len(plans[folder_path])
+    return plans
+
+
+def flatten_plans(tree, plans):
+    """[(old_path, new_path)] relative to the tree root, for previews and logs"""
+    return [(tree.relative(folder_path, old_name), tree.relative(folder_path, new_name))
+            for folder_path, plan in plans.items() for old_name, new_name in plan]
+
+
+def check_tree_conflicts(tree, plans):
+    """Check every folder's plan against that folder, returning (has_conflict, message)"""
+    for folder_path, plan in plans.items():
+        has_conflict, message = check_conflicts(plan, tree.snapshots[folder_path].names)
+        if has_conflict:
+            if folder_path != tree.root:
+                message += f" (in {os.path.relpath(folder_path, tree.root)})"
+            return True, message
+    return False, ""
+
+
+def _run_batches(jobs, workers):
+    """Run job() for each (folder_path, job) concurrently; returns (done, {folder_path: error})"""
+    done = []
+    failed = {}
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(job): folder_path for folder_path, job in jobs}
+        for future in as_completed(futures):
+            try:
+                future.result()
+                done.append(futures[future])
+            except Exception as e:
+                failed[futures[future]] = e
+    return done, failed
+
+
+def execute_tree(tree, plans, journal=None, workers=DEFAULT_WORKERS):
+    """Run each folder's plan as its own batch, several folders at a time.
+
+    A failing folder is rolled back on its own (see execute_renames) and
+    does not stop the others. Returns (renamed_folders, {folder_path: error}).
+    """
+    group = uuid.uuid4().hex
+    jobs = [(folder_path, partial(execute_renames, folder_path, plan, journal=journal,
+                                  snapshot=tree.snapshots.get(folder_path), group=group))
+            for folder_path, plan in plans.items()]
+    return _run_batches(jobs, workers)
+
+
+def undo_batches(journal, batches, workers=DEFAULT_WORKERS):
+    """Revert committed batches of one operation; files removed since are skipped"""
+    group = uuid.uuid4().hex
+    jobs = []
+    for batch in batches:
+        folder_path = batch['folder']
+        undo_map = [(new_name, old_name) for old_name, new_name in batch['plan']
+                    if os.path.lexists(os.path.join(folder_path, new_name))]
+        jobs.append((folder_path, partial(execute_renames, folder_path, undo_map, journal=journal,
+                                          undoes=batch['id'], group=group)))
+    return _run_batches(jobs, workers)
+
+
+def resume_batches(journal, batches, roll_forward, workers=DEFAULT_WORKERS):
+    """Finish or revert the interrupted batches of one operation"""
+    jobs = [(batch['folder'], partial(resume_batch, journal, batch, roll_forward)) for batch in batches]
+    return _run_batches(jobs, workers)
+
+
+def group_incomplete(journal):
+    """Interrupted batches of the journal, grouped by operation"""
+    groups = {}
+    for batch in journal.incomplete:
+        groups.setdefault(group_key(batch), []).append(batch)
+    return list(groups.values())
@@ -0,0 +1,231 @@
+"""Virtualized list view for folders with very many files.
+
+A VirtualList wraps a ttk.Treeview but only creates as many Treeview
+rows as fit on screen. The rows themselves stay in a plain Python list;
+the view shows a window of them starting at `top`, and scrolling just
+rewrites the values of the on-screen lines. The check mark selection is
+a bytearray indexed by row, so loading, filtering, select all and
+deselect all cost no Tk calls beyond redrawing the visible window.
+update_rows() swaps in new rows and only rewrites on-screen lines whose
+values changed, which keeps live previews cheap.
+"""
+import tkinter as tk
+from tkinter import ttk
+
+CHECK_MARK = "✓"
+WHEEL_LINES = 3
+
+
+class VirtualList:
+    def __init__(self, parent, columns, row_values, height=8, on_activate=None, checkable=True):
+        """columns is [(column_id, heading, width)]; with checkable the first one shows the check mark.
+
+        row_values(row) returns the values of the other columns for a row.
+        on_activate(row) is called when a row is clicked.
+        """
+        self.row_values = row_values
+        self.on_activate = on_activate
+        self.checkable = checkable
+        self.rows = []
+        self.visible = range(0)  # indices into rows that pass the filter, in display order
+        self.selected = bytearray()
+        self.top = 0
+        self.lines = height  # how many rows fit on screen
+        self.current = None  # index of the row last clicked
+        self.items = []  # Treeview item ids, one per on-screen line
+        self.drawn = []  # values last written to each on-screen line
+
+        self.tree = ttk.Treeview(parent, columns=[c[0] for c in columns], show="headings",
+                                 height=height, selectmode="browse")
+        for column_id, heading, width in columns:
+            self.tree.heading(column_id, text=heading)
+            self.tree.column(column_id, width=width)
+        if checkable:
+            self.tree.column(columns[0][0], anchor="center")
+
+        self.scrollbar = ttk.Scrollbar(parent, orient=tk.VERTICAL, command=self.on_scrollbar)
+
+        self.tree.bind("<Button-1>", self.on_click)
+        self.tree.bind("<MouseWheel>", lambda e: self.scroll(-WHEEL_LINES if e.delta > 0 else WHEEL_LINES))
+        self.tree.bind("<Button-4>", lambda e: self.scroll(-WHEEL_LINES))
+        self.tree.bind("<Button-5>", lambda e: self.scroll(WHEEL_LINES))
+        self.tree.bind("<Up>", lambda e: self.move_current(-1))
+        self.tree.bind("<Down>", lambda e: self.move_current(1))
+        self.tree.bind("<Prior>", lambda e: self.scroll(-self.lines))
+        self.tree.bind("<Next>", lambda e: self.scroll(self.lines))
+        self.tree.bind("<Configure>", self.on_resize)
+
+    # ----- model -----
+    def set_rows(self, rows):
+        """Replace the backing rows, clearing the filter and selection"""
+        self.rows = rows
+        self.visible = range(len(rows))
+        self.selected = bytearray(len(rows))
+        self.top = 0
+        self.current = None
+        self.refresh()
+
+    def clear(self):
+        self.set_rows([])
+
+    def update_rows(self, rows):
+        """Replace the rows but keep the scroll position and selection if the count is unchanged"""
+        if len(rows) != len(self.rows) or not isinstance(self.visible, range):
+            self.set_rows(rows)
+            return
+        self.rows = rows
+        self.refresh()
+
+    def set_filter(self, predicate=None):
+        """Show only rows for which predicate(row) is true (all rows if None)"""
+        if predicate is None:
+            self.set_visible(None)
+        else:
+            self.set_visible([i for i, row in enumerate(self.rows) if predicate(row)])
+
+    def set_visible(self, indices=None):
+        """Show only the rows at indices, in that order (all rows if None)"""
+        self.visible = range(len(self.rows)) if indices is None else indices
+        self.top = 0
+        self.refresh()
+
+    def select_all(self):
+        """Check every row that passes the filter"""
+        if len(self.visible) == len(self.rows):
+            self.selected = bytearray(b"\x01") * len(self.rows)
+        else:
+            for index in self.visible:
+                self.selected[index] = 1
+        self.refresh()
+
+    def select_rows(self, predicate):
+        """Check every row (visible or not) for which predicate(row) is true"""
+        for index, row in enumerate(self.rows):
+            if predicate(row):
+                self.selected[index] = 1
+        self.refresh()
+
+    def deselect_all(self):
+        self.selected = bytearray(len(self.rows))
+        self.refresh()
+
+    def has_selection(self):
+        return 1 in self.selected
+
+    def selected_rows(self):
+        """Checked rows in backing order, including ones hidden by the filter"""
+        return [row for row, flag in zip(self.rows, self.selected) if flag]
+
+    # ----- view -----
+    def refresh(self):
+        """Redraw the on-screen window from the model"""
+        total = len(self.visible)
+        self.top = max(0, min(self.top, total - self.lines))
+        shown = min(self.lines, total - self.top)
+
+        if shown and not self.items:
+            self.tree.after_idle(self.fit)  # row height is known once a row exists
+        while len(self.items) < shown:
+            self.items.append(self.tree.insert("", tk.END))
+            self.drawn.append(None)
+        if len(self.items) > shown:
+            self.tree.delete(*self.items[shown:])
+            del self.items[shown:]
+            del self.drawn[shown:]
+
+        highlighted = ()
+        for line, item in enumerate(self.items):
+            index = self.visible[self.top + line]
+            values = tuple(self.row_values(self.rows[index]))
+            if self.checkable:
+                values = (CHECK_MARK if self.selected[index] else "",) + values
+            # Only lines whose text changed cost a Tk call
+            if values != self.drawn[line]:
+                self.tree.item(item, values=values)
+                self.drawn[line] = values
+            if index == self.current:
+                highlighted = (item,)
+        if highlighted != self.tree.selection():
+            self.tree.selection_set(highlighted)
+
+        if total:
+            self.scrollbar.set(self.top / total, (self.top + shown) / total)
+        else:
+            self.scrollbar.set(0, 1)
+
+    def scroll(self, lines):
+        self.top += lines
+        self.refresh()
+        return "break"
+
+    def on_scrollbar(self, action, amount, unit=None):
+        if action == "moveto":
+            self.top = int(float(amount) * len(self.visible))
+            self.refresh()
+        elif action == "scroll":
+            self.scroll(int(amount) * (self.lines if unit == "pages" else 1))
+
+    def on_resize(self, event):
+        self.fit()
+
+    def fit(self):
+        """Match the number of on-screen lines to the Treeview's current height"""
+        if not self.items:
+            return
+        bbox = self.tree.bbox(self.items[0])
+        if not bbox:
+            return
+        header, row_height = bbox[1], bbox[3]
+        lines = max(1, (self.tree.winfo_height() - header) // max(1, row_height))
+        if lines != self.lines:
+            self.lines = lines
+            self.refresh()
+
+    def move_current(self, lines):
+        """Make the row lines away from the current one current, or just scroll if there is none"""
+        if self.current is None or not self.visible:
+            return self.scroll(lines)
+        try:
+            position = self.visible.index(self.current)
+        except ValueError:
+            return self.scroll(lines)  # hidden by the filter
+        position = max(0, min(position + lines, len(self.visible) - 1))
+        self.current = self.visible[position]
+        # Keep the current row on screen
+        if position < self.top:
+            self.top = position
+        elif position >= self.top + self.lines:
+            self.top = position - self.lines + 1
+        self.refresh()
+        if self.on_activate:
+            self.on_activate(self.rows[self.current])
+        return "break"
+
+    def neighbor_rows(self, distance=1):
+        """Rows up to distance lines before and after the current one, nearest first"""
+        if self.current is None:
+            return []
+        try:
+            position = self.visible.index(self.current)
+        except ValueError:
+            return []
+        neighbors = []
+        for offset in range(1, distance + 1):
+            for near in (position + offset, position - offset):
+                if 0 <= near < len(self.visible):
+                    neighbors.append(self.rows[self.visible[near]])
+        return neighbors
+
+    def on_click(self, event):
+        item = self.tree.identify_row(event.y)
+        if not item:
+            return "break"
+        index = self.visible[self.top + self.items.index(item)]
+        if self.checkable:
+            self.selected[index] ^= 1
+        self.current = index
+        self.tree.focus_set()
+        self.refresh()
+        if self.on_activate:
+            self.on_activate(self.rows[index])
+        return "break"